@@ -2,76 +2,81 @@
 Memory-efficient data analyzer with streaming support
 """
 import gc
-from collections import Counter, defaultdict
 from typing import List, Dict, Any, Iterator, Optional
 import numpy as np
 
+MAX_NUMBER = 46
+MAX_ODD_COUNT = 7  # 본번호 6개 + 보너스 1개
+
+RANGE_LABELS = ('1-10', '11-20', '21-30', '31-40', '41-46')
+# Number -> range bucket index (-1 for numbers outside 1..46)
+RANGE_LOOKUP = np.full(MAX_NUMBER + 1, -1, dtype=np.int64)
+for _bucket, (_low, _high) in enumerate([(1, 10), (11, 20), (21, 30), (31, 40), (41, 46)]):
+    RANGE_LOOKUP[_low:_high + 1] = _bucket
+
 class StreamingDataAnalyzer:
     """Memory-efficient data analyzer that processes data in streams"""
     
     def __init__(self):
-        self.frequency_counter = Counter()
+        self._init_accumulators()
+        
+    def _init_accumulators(self) -> None:
+        """Fixed-size accumulators: memory does not grow with the number of results"""
+        self.frequency = np.zeros(MAX_NUMBER + 1, dtype=np.int64)
         self.total_simulations = 0
-        self.pattern_stats = {
-            'consecutive_pairs': 0,
-            'odd_counts': [],
-            'even_counts': [],
-            'range_counts': defaultdict(int)
-        }
+        self.consecutive_pairs = 0
+        self.odd_histogram = np.zeros(MAX_ODD_COUNT + 1, dtype=np.int64)
+        self.odd_total = 0
+        self.even_total = 0
+        self.range_counts = np.zeros(len(RANGE_LABELS), dtype=np.int64)
         
     def add_result(self, result: List[int]) -> None:
         """Add a single simulation result"""
         if not result:
             return
-            
-        # Update frequency
-        self.frequency_counter.update(result)
-        self.total_simulations += 1
-        
-        # Update pattern statistics
-        self._update_patterns(result)
+        self._update(np.asarray(result, dtype=np.int64)[np.newaxis, :])
         
     def add_results_batch(self, results: List[List[int]]) -> None:
         """Add batch of results efficiently"""
-        for result in results:
-            self.add_result(result)
-            
-    def _update_patterns(self, result: List[int]) -> None:
-        """Update pattern statistics for a single result"""
-        sorted_result = sorted(result)
+        results = [result for result in results if len(result)]
+        if not results:
+            return
+        if len({len(result) for result in results}) == 1:
+            self._update(np.asarray(results, dtype=np.int64))
+        else:
+            # Ragged batch: fall back to one row at a time
+            for result in results:
+                self.add_result(result)
+                
+    def _update(self, results: np.ndarray) -> None:
+        """Update all accumulators for a (B, k) block of results"""
+        numbers = results.ravel()
+        valid = numbers[(numbers >= 0) & (numbers <= MAX_NUMBER)]
+        self.frequency += np.bincount(valid, minlength=MAX_NUMBER + 1)
+        self.total_simulations += len(results)
         
         # Count consecutive pairs
-        for i in range(len(sorted_result) - 1):
-            if sorted_result[i + 1] - sorted_result[i] == 1:
-                self.pattern_stats['consecutive_pairs'] += 1
-                
+        self.consecutive_pairs += int(np.count_nonzero(np.diff(np.sort(results, axis=1), axis=1) == 1))
+        
         # Count odd/even
-        odd_count = sum(1 for num in result if num % 2 == 1)
-        even_count = len(result) - odd_count
-        self.pattern_stats['odd_counts'].append(odd_count)
-        self.pattern_stats['even_counts'].append(even_count)
+        odd_counts = np.count_nonzero(results % 2 == 1, axis=1)
+        self.odd_total += int(odd_counts.sum())
+        self.even_total += int(results.size - odd_counts.sum())
+        self.odd_histogram += np.bincount(np.minimum(odd_counts, MAX_ODD_COUNT),
+                                          minlength=MAX_ODD_COUNT + 1)
         
         # Count by ranges
-        for num in result:
-            if 1 <= num <= 10:
-                self.pattern_stats['range_counts']['1-10'] += 1
-            elif 11 <= num <= 20:
-                self.pattern_stats['range_counts']['11-20'] += 1
-            elif 21 <= num <= 30:
-                self.pattern_stats['range_counts']['21-30'] += 1
-            elif 31 <= num <= 40:
-                self.pattern_stats['range_counts']['31-40'] += 1
-            elif 41 <= num <= 46:
-                self.pattern_stats['range_counts']['41-46'] += 1
-                
+        buckets = RANGE_LOOKUP[valid]
+        self.range_counts += np.bincount(buckets[buckets >= 0], minlength=len(RANGE_LABELS))
+        
     def get_frequency_analysis(self) -> Dict[str, Any]:
         """Get frequency analysis results"""
         if self.total_simulations == 0:
             return {}
             
         frequency_dict = {}
-        for number in sorted(self.frequency_counter.keys()):
-            count = self.frequency_counter[number]
+        for number in np.flatnonzero(self.frequency):
+            count = int(self.frequency[number])
             percentage = (count / self.total_simulations) * 100
             frequency_dict[str(number)] = {
                 'count': count,
@@ -90,29 +95,29 @@ class StreamingDataAnalyzer:
         if self.total_simulations == 0:
             return {}
             
-        odd_counts = self.pattern_stats['odd_counts']
-        even_counts = self.pattern_stats['even_counts']
-        
         return {
-            'consecutive_pairs': self.pattern_stats['consecutive_pairs'],
-            'avg_odd': round(sum(odd_counts) / len(odd_counts), 1) if odd_counts else 0,
-            'avg_even': round(sum(even_counts) / len(even_counts), 1) if even_counts else 0,
-            'range_distribution': dict(self.pattern_stats['range_counts'])
+            'consecutive_pairs': self.consecutive_pairs,
+            'avg_odd': round(self.odd_total / self.total_simulations, 1),
+            'avg_even': round(self.even_total / self.total_simulations, 1),
+            'odd_count_distribution': self.odd_histogram.tolist(),
+            'range_distribution': {label: int(count) for label, count
+                                   in zip(RANGE_LABELS, self.range_counts) if count}
         }
         
     def _get_most_frequent(self) -> Optional[Dict[str, Any]]:
         """Get most frequent number"""
-        if not self.frequency_counter:
+        if not self.frequency.any():
             return None
-        number, count = self.frequency_counter.most_common(1)[0]
-        return {'number': number, 'count': count}
+        number = int(np.argmax(self.frequency))
+        return {'number': number, 'count': int(self.frequency[number])}
         
     def _get_least_frequent(self) -> Optional[Dict[str, Any]]:
-        """Get least frequent number"""
-        if not self.frequency_counter:
+        """Get least frequent number (among numbers drawn at least once)"""
+        if not self.frequency.any():
             return None
-        number, count = self.frequency_counter.most_common()[-1]
-        return {'number': number, 'count': count}
+        seen = np.flatnonzero(self.frequency)
+        number = int(seen[np.argmin(self.frequency[seen])])
+        return {'number': number, 'count': int(self.frequency[number])}
         
     def predict_numbers(self, num_predictions: int = 7) -> Dict[str, Any]:
         """Predict next numbers based on analysis"""
@@ -125,16 +130,12 @@ class StreamingDataAnalyzer:
         total_weight = 0.7
         
         # Get recent frequency (last 20% of data)
-        recent_count = max(1, len(self.pattern_stats['odd_counts']) // 5)
-        if recent_count > 0:
-            # This is simplified - in real implementation, we'd track recent results
-            recent_frequency = self.frequency_counter
-        else:
-            recent_frequency = Counter()
-            
+        # This is simplified - in real implementation, we'd track recent results
+        recent_frequency = self.frequency
+        
         for num in range(1, 47):
-            total_freq = self.frequency_counter.get(num, 0)
-            recent_freq = recent_frequency.get(num, 0)
+            total_freq = int(self.frequency[num])
+            recent_freq = int(recent_frequency[num])
             weighted_scores[num] = total_freq * total_weight + recent_freq * 3 * recent_weight
             
         # Get top predictions
@@ -145,7 +146,7 @@ class StreamingDataAnalyzer:
         prediction_details = {}
         for num in predicted_numbers:
             prediction_details[num] = {
-                'total_frequency': self.frequency_counter.get(num, 0),
+                'total_frequency': int(self.frequency[num]),
                 'score': round(weighted_scores[num], 1)
             }
             
@@ -168,14 +169,7 @@ class StreamingDataAnalyzer:
             
     def reset(self) -> None:
         """Reset analyzer state"""
-        self.frequency_counter.clear()
-        self.total_simulations = 0
-        self.pattern_stats = {
-            'consecutive_pairs': 0,
-            'odd_counts': [],
-            'even_counts': [],
-            'range_counts': defaultdict(int)
-        }
+        self._init_accumulators()
         gc.collect()
         
     def get_summary(self) -> Dict[str, Any]:
@@ -10,6 +10,7 @@ from utils.memory_manager import ResourceManager
 from jackson_hwang_rng import JacksonHwangRNG
 from entropy_analyzer import EntropyDriftAnalyzer
 from statistical_thermodynamics import StatisticalThermodynamics
+from config import REQUEST_TIME_BUDGET
 
 class LottoAPI:
     """Memory-efficient API for lotto simulation"""
@@ -39,12 +40,13 @@ class LottoAPI:
             self.thermo = StatisticalThermodynamics()
         return self.thermo
         
-    def generate_single_numbers(self, seed: Optional[int] = None) -> Dict[str, Any]:
+    def generate_single_numbers(self, seed: Optional[int] = None,
+                                time_budget: float = REQUEST_TIME_BUDGET) -> Dict[str, Any]:
         """Generate single set of numbers with minimal memory usage"""
         try:
-            # Generate ball numbers using RNG
+            # Generate ball numbers using RNG within the request deadline
             rng = self._get_rng()
-            ball_numbers = rng.generate_numbers(46, 1, 46)
+            ball_numbers = rng.generate_numbers(46, 1, 46, time_budget=time_budget)
             
             # Run single simulation
             sim_manager = SimulationManager()
@@ -65,6 +67,7 @@ class LottoAPI:
                 'success': True,
                 'numbers': results,
                 'analysis': basic_analysis,
+                'quality_tier': rng.last_run_info['quality_tier'],
                 'resource_usage': self.resource_manager.get_resource_status()
             }
             
@@ -75,15 +78,20 @@ class LottoAPI:
                 'resource_usage': self.resource_manager.get_resource_status()
             }
             
-    def run_batch_simulation(self, num_simulations: int = 10) -> Dict[str, Any]:
+    def run_batch_simulation(self, num_simulations: int = 10,
+                             time_budget: float = REQUEST_TIME_BUDGET) -> Dict[str, Any]:
         """Run batch simulation with memory management"""
         try:
             self.analyzer.reset()
             rng = self._get_rng()
             
+            # Draw all ball orderings from a single equilibrated trajectory
+            ball_orderings = iter(rng.generate_batch(num_simulations, 46, 1, 46,
+                                                     time_budget=time_budget))
+            
             # Generator function for ball numbers
             def number_generator():
-                return rng.generate_numbers(46, 1, 46)
+                return next(ball_orderings)
                 
             # Run simulations in batches
             batch_runner = SimulationBatch(batch_size=5)
@@ -105,6 +113,7 @@ class LottoAPI:
                 'total_simulations': len(results),
                 'results': results[-10:],  # Return only last 10 results to save memory
                 'analysis': analysis,
+                'quality_tier': rng.last_run_info['quality_tier'],
                 'resource_usage': self.resource_manager.get_resource_status()
             }
             
@@ -1,28 +1,39 @@
-from flask import Flask, render_template, jsonify, request, send_file, send_from_directory, abort
+from flask import Flask, render_template, jsonify, request, send_file, send_from_directory, abort, g
 import numpy as np
 import os
+import secrets
 import time
 import hashlib
 import threading
+import atexit
 
 # 안전한 import 처리
 try:
-    from jackson_hwang_rng import JacksonHwangRNG
-    rng = JacksonHwangRNG()
+    from jackson_hwang_rng import JacksonHwangRNG, JacksonHwangEnsemble
+    from config import MOLECULAR_SIMULATION_CONFIG
+    if MOLECULAR_SIMULATION_CONFIG['replicas'] > 0:
+        # 다중 프로세스 레플리카 모드 (프로세스는 첫 요청 시 워커 안에서 생성)
+        rng = JacksonHwangEnsemble()
+        atexit.register(rng.close)
+    else:
+        rng = JacksonHwangRNG()
 except ImportError:
     print("Warning: JacksonHwangRNG not available")
     rng = None
 
+# 공유 RNG는 하나의 분자 궤적을 사용하므로 요청 간 직렬화
+rng_lock = threading.Lock()
+
 try:
     from entropy_analyzer import EntropyDriftAnalyzer
-    entropy_analyzer = EntropyDriftAnalyzer()
+    ENTROPY_AVAILABLE = True
 except ImportError:
     print("Warning: EntropyDriftAnalyzer not available")
-    entropy_analyzer = None
+    ENTROPY_AVAILABLE = False
 
 try:
     from statistical_thermodynamics import StatisticalThermodynamics
-    thermo = StatisticalThermodynamics()
+    thermo = StatisticalThermodynamics()  # 기본 설정 (요청별로 변경하지 않음)
 except ImportError:
     print("Warning: StatisticalThermodynamics not available")
     thermo = None
@@ -42,16 +53,65 @@ except ImportError:
     MAIN_AVAILABLE = False
 
 try:
-    from config import LOTTO_MIN_NUMBER, LOTTO_MAX_NUMBER, DEFAULT_TEMPERATURE, DEFAULT_MOLECULES
+    from config import LOTTO_MIN_NUMBER, LOTTO_MAX_NUMBER, DEFAULT_TEMPERATURE, DEFAULT_MOLECULES, MAX_TICKETS_PER_REQUEST, REQUEST_TIME_BUDGET
 except ImportError:
     # 기본값 설정
     LOTTO_MIN_NUMBER = 1
     LOTTO_MAX_NUMBER = 45
     DEFAULT_TEMPERATURE = 298.15
     DEFAULT_MOLECULES = 1000
+    MAX_TICKETS_PER_REQUEST = 10
+    REQUEST_TIME_BUDGET = 25.0
+
+try:
+    from config import SESSION_REGISTRY_CONFIG
+except ImportError:
+    SESSION_REGISTRY_CONFIG = {'max_sessions': 1024, 'max_memory_mb': 64,
+                               'idle_timeout': 1800, 'header': 'X-Session-ID',
+                               'cookie': 'lotto_session'}
+
+from utils.session_registry import SessionRegistry
+
+def create_session_state():
+    """세션별 경량 분석 상태 (엔트로피 드리프트 이력, 열역학 온도)"""
+    return {
+        'entropy_analyzer': EntropyDriftAnalyzer() if ENTROPY_AVAILABLE else None,
+        'thermo': StatisticalThermodynamics() if thermo else None
+    }
+
+# 세션별 분석기 레지스트리 (LRU + 유휴 만료, 세션마다 개별 잠금)
+session_registry = SessionRegistry(
+    create_session_state,
+    max_entries=SESSION_REGISTRY_CONFIG['max_sessions'],
+    max_memory_mb=SESSION_REGISTRY_CONFIG['max_memory_mb'],
+    idle_timeout=SESSION_REGISTRY_CONFIG['idle_timeout']
+)
+
+def get_session_key():
+    """요청의 세션 식별자: 헤더, 세션 쿠키 순으로 찾고 없으면 새로 발급
+    
+    클라이언트 IP는 쓰지 않음 (프록시 뒤에서는 모든 사용자가 같은 IP)
+    """
+    key = request.headers.get(SESSION_REGISTRY_CONFIG['header']) or \
+        request.cookies.get(SESSION_REGISTRY_CONFIG['cookie'])
+    if not key:
+        # 새 세션 ID는 응답 시 쿠키로 내려보냄 (set_session_cookie)
+        key = g.get('new_session_id') or secrets.token_urlsafe(16)
+        g.new_session_id = key
+    return key
 
 app = Flask(__name__)
 
+@app.after_request
+def set_session_cookie(response):
+    """이번 요청에서 발급한 세션 ID를 쿠키로 저장"""
+    session_id = g.pop('new_session_id', None)
+    if session_id:
+        # 브라우저 세션 쿠키: 서버 쪽 상태는 레지스트리의 유휴 만료가 정리
+        response.set_cookie(SESSION_REGISTRY_CONFIG['cookie'], session_id,
+                            httponly=True, samesite='Lax')
+    return response
+
 # 시뮬레이션 로그 저장 (동시성 안전)
 simulation_logs = []
 simulation_logs_lock = threading.Lock()
@@ -77,20 +137,37 @@ def generate_numbers():
     """Jackson-Hwang 분자운동 기반 번호 생성"""
     try:
         start_time = time.time()
+        data = request.get_json(silent=True) or {}
+        count = max(1, min(int(data.get('count', 1)), MAX_TICKETS_PER_REQUEST))
+        
+        quality_tier = None
+        equilibration_steps = None
         
-        # 분자운동 시뮬레이션 실행
+        # 분자운동 시뮬레이션 실행 (요청 데드라인 내에서)
         if rng:
-            numbers = rng.generate_numbers()
-            # 엔트로피 분석
-            if entropy_analyzer:
-                analysis = entropy_analyzer.analyze_drift(rng.velocities)
-            else:
-                analysis = None
+            with rng_lock:
+                time_budget = REQUEST_TIME_BUDGET - (time.time() - start_time)
+                # 여러 장은 하나의 궤적에서 한 번에 생성
+                if count > 1:
+                    tickets = rng.generate_batch(count, time_budget=time_budget)
+                else:
+                    tickets = [rng.generate_numbers(time_budget=time_budget)]
+                quality_tier = rng.last_run_info['quality_tier']
+                equilibration_steps = rng.last_run_info.get('equilibration_steps')
+                velocities = np.array(rng.velocities)
+            # 엔트로피 분석 (세션별 분석기)
+            with session_registry.session(get_session_key()) as state:
+                if state['entropy_analyzer']:
+                    analysis = state['entropy_analyzer'].analyze_drift(velocities)
+                else:
+                    analysis = None
         else:
             # 폴백: 기본 난수 생성
             import random
-            numbers = sorted(random.sample(range(LOTTO_MIN_NUMBER, LOTTO_MAX_NUMBER + 1), 6))
+            tickets = [sorted(random.sample(range(LOTTO_MIN_NUMBER, LOTTO_MAX_NUMBER + 1), 6))
+                       for _ in range(count)]
             analysis = None
+        numbers = tickets[0]
         
         # 처리 시간 계산
         processing_time = (time.time() - start_time) * 1000
@@ -100,16 +177,23 @@ def generate_numbers():
             'timestamp': time.time(),
             'event': 'NUMBER_GENERATION',
             'numbers': numbers,
+            'tickets': tickets,
+            'quality_tier': quality_tier,
+            'equilibration_steps': equilibration_steps,
             'entropy': analysis['entropy'] if analysis else None,
             'processing_time_ms': round(processing_time, 2),
             'algorithm': 'Jackson-Hwang Molecular RNG' if rng else 'Fallback RNG',
-            'integrity_hash': generate_integrity_hash(numbers)
+            'integrity_hash': generate_integrity_hash(tickets)
         }
         with simulation_logs_lock:
             simulation_logs.append(log_entry)
         
         return jsonify({
             'numbers': numbers,
+            'tickets': tickets,
+            'count': count,
+            'quality_tier': quality_tier,
+            'equilibration_steps': equilibration_steps,
             'entropy': analysis['entropy'] if analysis else None,
             'is_stable': analysis['is_stable'] if analysis else False,
             'processing_time_ms': round(processing_time, 2),
@@ -127,14 +211,17 @@ def analyze_entropy():
         data = request.get_json()
         molecular_data = data.get('molecular_data', [])
         
-        # 분자 데이터 기반 엔트로피 분석
-        analysis = entropy_analyzer.analyze_drift(np.array(molecular_data))
+        # 분자 데이터 기반 엔트로피 분석 (세션별 분석기)
+        with session_registry.session(get_session_key()) as state:
+            entropy_analyzer = state['entropy_analyzer']
+            analysis = entropy_analyzer.analyze_drift(np.array(molecular_data))
+            recommendations = entropy_analyzer.get_recommendations(analysis)
         
         return jsonify({
             'entropy_level': analysis['entropy'] if analysis else 0,
             'drift_detected': analysis['drift'] if analysis else 0,
             'stability_status': 'STABLE' if analysis and analysis['is_stable'] else 'CONVERGING',
-            'recommendations': entropy_analyzer.get_recommendations(analysis)
+            'recommendations': recommendations
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -147,19 +234,37 @@ def thermodynamic_optimization():
         candidates = data.get('candidates', list(range(LOTTO_MIN_NUMBER, LOTTO_MAX_NUMBER + 1)))
         temperature = data.get('temperature', DEFAULT_TEMPERATURE)
         
-        # 온도 설정 업데이트
-        thermo.temperature = temperature
-        
-        # 열역학적 최적화 실행
-        optimized_numbers = thermo.optimize_numbers(candidates)
+        # 후보 목록(들)과 온도(들)를 티켓 행렬로 맞춤: 한 번의 호출로 여러 장 처리
+        candidate_rows = np.atleast_2d(np.array(candidates))
+        temperatures = np.atleast_1d(np.array(temperature, dtype=float))
+        if len(candidate_rows) > 1 and len(temperatures) > 1 and len(candidate_rows) != len(temperatures):
+            return jsonify({'error': f'candidates has {len(candidate_rows)} rows but temperature has '
+                                     f'{len(temperatures)} values; give one temperature or one per row'}), 400
+        count = min(max(len(candidate_rows), len(temperatures)), MAX_TICKETS_PER_REQUEST)
+        candidate_rows = np.broadcast_to(candidate_rows, (count, candidate_rows.shape[1])) \
+            if len(candidate_rows) == 1 else candidate_rows[:count]
+        temperatures = np.broadcast_to(temperatures, (count,)) \
+            if len(temperatures) == 1 else temperatures[:count]
         
-        # 자유 에너지 계산
-        energy_levels = np.array(candidates, dtype=float)
-        free_energy = thermo.free_energy(energy_levels)
+        with session_registry.session(get_session_key()) as state:
+            session_thermo = state['thermo']
+            # 온도 설정 업데이트 (세션 전용 인스턴스)
+            session_thermo.temperature = float(temperatures[0])
+            
+            # 열역학적 최적화 실행 (행별 온도, 부분 선택)
+            selected = session_thermo.optimize_numbers_batch(candidate_rows, temperatures)
+            tickets = np.take_along_axis(candidate_rows, selected, axis=1).tolist()
+            
+        # 자유 에너지 계산 (공유 인스턴스의 메모이제이션 캐시, 온도는 인자로 전달)
+        free_energies = np.array([thermo.free_energy(row, T)
+                                  for row, T in zip(candidate_rows, temperatures)])
         
         return jsonify({
-            'optimized_numbers': optimized_numbers,
-            'free_energy': float(free_energy),
+            'optimized_numbers': tickets[0],
+            'tickets': tickets,
+            'count': count,
+            'free_energy': float(free_energies[0]),
+            'free_energies': free_energies.tolist(),
             'temperature': temperature,
             'optimization_method': 'Statistical Thermodynamics',
             'convergence_status': 'CONVERGED'
@@ -210,21 +315,28 @@ def get_simulation_logs():
 def system_status():
     """시스템 상태 조회"""
     try:
+        state = session_registry.peek(get_session_key())
+        session_analyzer = state['entropy_analyzer'] if state else None
+        session_thermo = state['thermo'] if state else thermo
+        data_points = session_analyzer.total_samples if session_analyzer else 0
         return jsonify({
             'algorithms': {
                 'jackson_hwang_rng': {
                     'status': 'ACTIVE',
                     'last_execution': time.time(),
-                    'success_rate': 99.7
+                    'success_rate': 99.7,
+                    'equilibration': get_equilibration_report()
                 },
                 'entropy_analyzer': {
-                    'status': 'ACTIVE' if len(entropy_analyzer.entropy_history) > 0 else 'STANDBY',
-                    'data_points': len(entropy_analyzer.entropy_history),
-                    'convergence_rate': 0.01
+                    'status': 'ACTIVE' if data_points > 0 else 'STANDBY',
+                    'data_points': data_points,
+                    'convergence_rate': 0.01,
+                    'sessions': session_registry.get_stats()
                 },
                 'thermodynamic_engine': {
                     'status': 'OPTIMIZED',
-                    'temperature': thermo.temperature,
+                    'temperature': session_thermo.temperature,
+                    'free_energy_cache': thermo.get_cache_stats(),
                     'efficiency': 96.1
                 }
             },
@@ -319,6 +431,20 @@ def mobile_generate_numbers():
         else:
             # 폴백: 기본 번호 생성
             import random
+            image_analysis = None
+            if image_data and quantum_analyzer:
+                # 업로드 이미지는 메모리에서 바로 디코딩 (축소 후 정규화)
+                # 같은 사진의 재업로드는 특징 캐시에서 바로 반환
+                features = quantum_analyzer.analyze_upload(image_data)
+                image_analysis = {
+                    'width': features['width'],
+                    'height': features['height'],
+                    'entanglement_entropy': float(features['entanglement_entropy']),
+                    'coherence': float(features['coherence']),
+                    'total_entropy': float(features['total_entropy'])
+                }
+                if not seed_value:
+                    seed_value = int(features['entanglement_entropy'] * 1e6)
             if seed_value:
                 random.seed(seed_value)
             numbers = sorted(random.sample(range(LOTTO_MIN_NUMBER, LOTTO_MAX_NUMBER + 1), 6))
@@ -332,6 +458,8 @@ def mobile_generate_numbers():
                     'average': round(sum(numbers) / len(numbers), 1)
                 }
             }
+            if image_analysis:
+                result['image_analysis'] = image_analysis
         
         return jsonify(result)
     except Exception as e:
@@ -347,6 +475,20 @@ def generate_integrity_hash(numbers):
     data_string = f"{numbers}{time.time()}"
     return hashlib.sha256(data_string.encode()).hexdigest()[:16]
 
+def get_equilibration_report():
+    """평형 단계 사용량 보고 (조기 수렴으로 절약된 단계 포함)"""
+    stats = getattr(rng, 'equilibration_stats', None)
+    if not stats:
+        return None
+    
+    budgeted = stats['steps_budgeted']
+    return {
+        'runs': stats['runs'],
+        'converged_runs': stats['converged_runs'],
+        'average_steps': stats['steps_used'] / stats['runs'] if stats['runs'] else 0,
+        'steps_saved_ratio': 1 - stats['steps_used'] / budgeted if budgeted else 0.0
+    }
+
 def calculate_confidence_score(analysis):
     """신뢰도 점수 계산"""
     if not analysis:
@@ -1,15 +1,30 @@
+import os
+
 MOLECULAR_SIMULATION_CONFIG = {
     'num_particles': 1000,      # 분자 입자 수
     'temperature': 298.15,      # 시뮬레이션 온도 (K)
     'pressure': 101325,         # 압력 (Pa)
     'time_step': 0.001,         # 시간 간격 (s)
-    'equilibrium_steps': 10000  # 평형 달성 단계
+    'equilibrium_steps': 10000, # 평형 달성 단계
+    'decorrelation_steps': 100, # 다중 티켓 샘플 간 비상관 간격
+    'early_stopping': True,     # 평형 수렴 시 조기 종료
+    'convergence_check_interval': 50,  # 수렴 관측 간격 (단계)
+    'convergence_window': 10,   # 수렴 판정 이동평균 윈도우 (관측 횟수)
+    'convergence_tolerance': 0.02, # 운동 온도 드리프트 허용 오차
+    'replicas': 0,              # 다중 프로세스 레플리카 수 (0 = 단일 프로세스 모드)
+    'checkpoint_dir': os.environ.get('LOTTO_MD_CHECKPOINT_DIR'),  # 입자 상태 체크포인트 디렉터리 (None = 비활성)
+    'checkpoint_interval': 1000, # 체크포인트 저장 간격 (단계)
+    'resume_on_init': os.environ.get('LOTTO_MD_DEFER_RESUME') != '1',  # 생성 시 체크포인트 재개 (워커 post_fork에서 재개하면 False)
+    'dtype': 'float64',         # 입자 배열 정밀도 ('float32' = 메모리 절약 모드)
+    'force_chunk_size': 64      # 힘 계산 시 한 번에 처리하는 입자 수
 }
 
 ENTROPY_ANALYSIS_CONFIG = {
     'window_size': 50,          # 분석 윈도우 크기
     'drift_threshold': 0.05,    # 드리프트 감지 임계값
-    'convergence_rate': 0.01    # 수렴 판정 기준
+    'convergence_rate': 0.01,   # 수렴 판정 기준
+    'histogram_bins': 64,       # 고정 구간 히스토그램 구간 수
+    'histogram_range': None     # (최소, 최대) 지정 시 고정 구간 엔트로피 사용, None이면 'auto'
 }
 
 ACCESS_LEVELS = {
@@ -84,3 +99,27 @@ LOTTO_MIN_NUMBER = 1
 LOTTO_MAX_NUMBER = 46
 DEFAULT_TEMPERATURE = MOLECULAR_SIMULATION_CONFIG['temperature']
 DEFAULT_MOLECULES = MOLECULAR_SIMULATION_CONFIG['num_particles']
+MAX_TICKETS_PER_REQUEST = 10  # 한 번의 요청으로 생성 가능한 최대 티켓 수
+REQUEST_TIME_BUDGET = 25.0    # 요청당 분자 시뮬레이션 시간 예산 (초, gunicorn timeout 30초 이내)
+
+SESSION_REGISTRY_CONFIG = {
+    'max_sessions': 1024,       # 세션별 분석기 최대 개수 (초과 시 LRU 제거)
+    'max_memory_mb': 64,        # 세션 상태 메모리 상한 (MB)
+    'idle_timeout': 1800,       # 유휴 세션 만료 시간 (초)
+    'header': 'X-Session-ID',   # 세션 식별 헤더 (API 클라이언트용, 있으면 쿠키보다 우선)
+    'cookie': 'lotto_session'   # 세션 쿠키 이름: 헤더가 없으면 첫 응답에서 발급 (클라이언트 IP는 사용 안 함)
+}
+
+IMAGE_ANALYSIS_CONFIG = {
+    'entropy_exact_max_dim': 512,   # 축약 밀도 행렬 엔트로피: 이 크기 이하면 정확한 SVD
+    'entropy_rank': 64,             # 그보다 크면 무작위 저랭크 근사의 랭크
+    'max_side': 256,                # 스펙트럼 분석 전 피라미드 축소 최대 변 길이 (None = 원본 유지)
+    'tile_size': 256,               # 타일 단위 특징 추출 시 타일 크기 (원본 해상도)
+    'feature_cache_size': 256,      # 이미지 특징 캐시 항목 수 (LRU)
+    'feature_cache_dir': os.environ.get('LOTTO_FEATURE_CACHE_DIR'),  # 디스크 캐시 디렉터리 (None = 메모리만)
+    'feature_cache_disk_size': 4096, # 디스크 캐시 최대 파일 수 (초과 시 오래 쓰지 않은 파일부터 삭제)
+    'interference_summary_side': 32, # 캐시에 보관할 간섭 패턴 요약의 최대 변 길이
+    'history_policy': 'summary',    # 특징 이력 보관: 'none' | 'last_k' (배열 k개) | 'summary' (요약 통계만)
+    'history_size': 16,             # 이력 보관 개수 k (요약 통계 링 버퍼 크기)
+    'fft_workers': -1               # scipy.fft 스레드 수 (-1 = 모든 코어)
+}
@@ -1,12 +1,120 @@
+from functools import lru_cache
 import numpy as np
 from config import ENTROPY_ANALYSIS_CONFIG as CONFIG
 
+# Rows per bincount block when scoring tickets one by one (bounds the temporary)
+BIAS_CHUNK_ROWS = 65536
+
+
+@lru_cache(maxsize=None)
+def _uniform_entropy(max_num):
+    """Shannon entropy (bits) of the uniform distribution over 1..max_num"""
+    return float(np.log2(max_num))
+    
+    
+def _count_entropy(counts):
+    """Shannon entropy (bits) of count vectors along the last axis"""
+    totals = counts.sum(axis=-1, keepdims=True)
+    p = counts / np.maximum(totals, 1)
+    return -np.sum(p * np.log2(np.where(p > 0, p, 1.0)), axis=-1)
+    
+
+class FixedEdgeHistogram:
+    """Histogram with precomputed uniform edges; mergeable streaming counts"""
+    
+    def __init__(self, bins=None, value_range=(0.0, 1.0)):
+        self.bins = bins or CONFIG['histogram_bins']
+        lo, hi = float(value_range[0]), float(value_range[1])
+        if lo == hi:
+            # Same convention as np.histogram for a degenerate range
+            lo, hi = lo - 0.5, hi + 0.5
+        self.lo, self.hi = lo, hi
+        self.width = (hi - lo) / self.bins
+        self.edges = np.linspace(lo, hi, self.bins + 1)
+        self.counts = np.zeros(self.bins, dtype=np.int64)
+        
+    @classmethod
+    def from_data(cls, data, bins=None):
+        """Edges spanning the range of the given data"""
+        data = np.asarray(data, dtype=float)
+        return cls(bins, (data.min(), data.max()))
+        
+    def quantize(self, values):
+        """Bin index of each value; out-of-range values go to the edge bins"""
+        idx = ((np.asarray(values, dtype=float) - self.lo) / self.width).astype(np.int64)
+        return np.clip(idx, 0, self.bins - 1)
+        
+    def histogram(self, values):
+        """Counts of the given values without touching the stream"""
+        return np.bincount(self.quantize(values).ravel(), minlength=self.bins)
+        
+    def update(self, values):
+        """Accumulate values into the streaming counts"""
+        self.counts += self.histogram(values)
+        return self
+        
+    def merge(self, other):
+        """Add another histogram's counts; both must share the same edges"""
+        if self.bins != other.bins or self.lo != other.lo or self.hi != other.hi:
+            raise ValueError("Cannot merge histograms with different bin edges")
+        self.counts += other.counts
+        return self
+        
+    def reset(self):
+        self.counts[:] = 0
+        
+    @property
+    def total(self):
+        return int(self.counts.sum())
+        
+    def _density_entropy(self, counts, totals):
+        hist = counts / (totals * self.width)
+        return -np.sum(hist * np.log2(hist + 1e-10), axis=-1)
+        
+    def entropy(self, values=None):
+        """Shannon entropy of the given values, or of the streaming counts"""
+        counts = self.counts if values is None else self.histogram(values)
+        total = counts.sum()
+        if total == 0:
+            return 0.0
+        return float(self._density_entropy(counts, total))
+        
+    def batch_entropy(self, samples):
+        """Entropy of every row of a (T, N) array in a single bincount"""
+        samples = np.asarray(samples, dtype=float)
+        num_samples, sample_size = samples.shape
+        
+        # Offset each row's bin indices so all rows share one bincount
+        idx = self.quantize(samples)
+        idx += np.arange(num_samples)[:, np.newaxis] * self.bins
+        counts = np.bincount(idx.ravel(), minlength=num_samples * self.bins)
+        return self._density_entropy(counts.reshape(num_samples, self.bins), sample_size)
+        
+        
 class EntropyDriftAnalyzer:
-    def __init__(self):
-        self.window_size = CONFIG['window_size']
-        self.drift_threshold = CONFIG['drift_threshold']
-        self.convergence_rate = CONFIG['convergence_rate']
-        self.entropy_history = []
+    def __init__(self, window_size=None, drift_threshold=None, convergence_rate=None,
+                 value_range=None):
+        self.window_size = window_size if window_size is not None else CONFIG['window_size']
+        self.drift_threshold = drift_threshold if drift_threshold is not None else CONFIG['drift_threshold']
+        self.convergence_rate = convergence_rate if convergence_rate is not None else CONFIG['convergence_rate']
+        
+        # Fixed edges make entropies comparable across calls; 'auto' otherwise
+        value_range = value_range if value_range is not None else CONFIG.get('histogram_range')
+        self.histogram = FixedEdgeHistogram(value_range=value_range) if value_range is not None else None
+        
+        # Fixed-capacity ring buffer: current window plus the previous one
+        self._ring = np.zeros(2 * self.window_size)
+        self._current_sum = 0.0
+        self._previous_sum = 0.0
+        self.total_samples = 0
+        
+    @property
+    def entropy_history(self):
+        """Most recent entropies (up to two windows), oldest first"""
+        capacity = len(self._ring)
+        count = min(self.total_samples, capacity)
+        start = self.total_samples - count
+        return [float(self._ring[i % capacity]) for i in range(start, self.total_samples)]
         
     def calculate_entropy(self, data):
         """Calculate Shannon entropy of the data"""
@@ -17,6 +125,9 @@ class EntropyDriftAnalyzer:
         if len(data.shape) > 1:
             data = np.linalg.norm(data, axis=1)
             
+        if self.histogram is not None:
+            return self.histogram.entropy(data)
+            
         hist, _ = np.histogram(data, bins='auto', density=True)
         entropy = -np.sum(hist * np.log2(hist + 1e-10))
         return entropy
@@ -24,22 +135,33 @@ class EntropyDriftAnalyzer:
     def analyze_drift(self, new_data):
         """Analyze entropy drift in the time series"""
         current_entropy = self.calculate_entropy(new_data)
-        self.entropy_history.append(current_entropy)
+        if self.histogram is not None:
+            data = np.asarray(new_data, dtype=float)
+            self.histogram.update(np.linalg.norm(data, axis=1) if data.ndim > 1 else data)
+        return self.update(current_entropy)
+        
+    def update(self, current_entropy):
+        """Add one entropy (or any scalar observable) and analyze its drift"""
+        self._push(current_entropy)
         
-        if len(self.entropy_history) < self.window_size:
-            return None, 0.0
+        if self.total_samples < self.window_size:
+            # Not enough history yet: report as not converged
+            return {
+                'entropy': current_entropy,
+                'drift': 0.0,
+                'convergence': float('inf'),
+                'is_stable': False
+            }
             
         # Calculate moving average
-        window = self.entropy_history[-self.window_size:]
-        ma = np.mean(window)
+        ma = self._current_sum / self.window_size
         
         # Calculate drift
         drift = (current_entropy - ma) / ma
         
         # Calculate convergence
-        if len(self.entropy_history) >= 2 * self.window_size:
-            prev_window = self.entropy_history[-2*self.window_size:-self.window_size]
-            prev_ma = np.mean(prev_window)
+        if self.total_samples >= 2 * self.window_size:
+            prev_ma = self._previous_sum / self.window_size
             convergence = abs(ma - prev_ma) / prev_ma
         else:
             convergence = float('inf')
@@ -51,16 +173,95 @@ class EntropyDriftAnalyzer:
             'is_stable': abs(drift) < self.drift_threshold and convergence < self.convergence_rate
         }
         
-    def get_distribution_bias(self, numbers, max_num=45):
-        """Analyze bias in number distribution"""
-        freq = np.zeros(max_num)
-        for num in numbers:
-            freq[num-1] += 1
+    def analyze_drift_batch(self, samples, bins=None):
+        """Analyze drift over a stack of T samples shaped (T, N, 3) or (T, N)
+        
+        All T entropies share one set of bin edges (the analyzer's fixed edges
+        if configured, else the pooled range of the stack), and the
+        drift/convergence series come from cumulative-sum windows.
+        The streaming history used by analyze_drift is not touched.
+        """
+        samples = np.asarray(samples, dtype=float)
+        if samples.ndim == 3:
+            samples = np.linalg.norm(samples, axis=2)
+        num_samples = len(samples)
+        
+        if self.histogram is not None and bins is None:
+            histogram = self.histogram
+        else:
+            histogram = FixedEdgeHistogram.from_data(samples, bins)
+        entropy = histogram.batch_entropy(samples)
+        
+        # Moving averages of the current and previous windows
+        w = self.window_size
+        csum = np.concatenate(([0.0], np.cumsum(entropy)))
+        ma = np.full(num_samples, np.nan)
+        ma[w-1:] = (csum[w:] - csum[:-w]) / w
+        
+        drift = np.zeros(num_samples)
+        drift[w-1:] = (entropy[w-1:] - ma[w-1:]) / ma[w-1:]
+        convergence = np.full(num_samples, np.inf)
+        convergence[2*w-1:] = np.abs(ma[2*w-1:] - ma[w-1:-w]) / ma[w-1:-w]
+        
+        return {
+            'entropy': entropy,
+            'drift': drift,
+            'convergence': convergence,
+            'is_stable': (np.abs(drift) < self.drift_threshold) & (convergence < self.convergence_rate),
+            'bin_edges': histogram.edges
+        }
+        
+    def _push(self, value):
+        """O(1) ring-buffer insert keeping both window sums up to date"""
+        w = self.window_size
+        capacity = 2 * w
+        n = self.total_samples
+        
+        if n >= w:
+            # The value w samples back moves from the current to the previous window
+            moved = self._ring[(n - w) % capacity]
+            self._current_sum -= moved
+            self._previous_sum += moved
+        if n >= capacity:
+            # The value 2w samples back (about to be overwritten) leaves the previous window
+            self._previous_sum -= self._ring[n % capacity]
             
-        freq_entropy = self.calculate_entropy(freq)
-        uniform_entropy = self.calculate_entropy(np.ones(max_num))
+        self._ring[n % capacity] = value
+        self._current_sum += value
+        self.total_samples = n + 1
         
-        bias = 1 - (freq_entropy / uniform_entropy)
+        # Re-sum once per lap so floating-point error cannot accumulate
+        if self.total_samples % capacity == 0:
+            self._current_sum = float(np.sum(self._ring[w:]))
+            self._previous_sum = float(np.sum(self._ring[:w]))
+            
+    def get_distribution_bias(self, numbers, max_num=45, per_row=False):
+        """Analyze bias in number distribution
+        
+        `numbers` is a flat sequence or an (M, k) ticket array of values in
+        1..max_num; anything outside raises ValueError. Bias is
+        1 - H(freq) / log2(max_num): 0 for perfectly uniform usage, 1 when a
+        single number is drawn. With per_row=True an (M,) array of per-ticket
+        biases is returned instead of the pooled one.
+        """
+        numbers = np.asarray(numbers, dtype=np.int64)
+        if numbers.size and (numbers.min() < 1 or numbers.max() > max_num):
+            raise ValueError(f"numbers must lie in 1..{max_num}")
+        uniform_entropy = _uniform_entropy(max_num)
+        
+        if not per_row:
+            freq = np.bincount(numbers.ravel() - 1, minlength=max_num)
+            return 1 - _count_entropy(freq) / uniform_entropy
+            
+        numbers = numbers.reshape(len(numbers), -1)
+        bias = np.empty(len(numbers))
+        for start in range(0, len(numbers), BIAS_CHUNK_ROWS):
+            block = numbers[start:start + BIAS_CHUNK_ROWS] - 1
+            rows = len(block)
+            # Offset each ticket's numbers so one bincount fills all rows
+            block = block + np.arange(rows)[:, np.newaxis] * max_num
+            freq = np.bincount(block.ravel(), minlength=rows * max_num).reshape(rows, max_num)
+            bias[start:start + rows] = 1 - _count_entropy(freq) / uniform_entropy
         return bias
         
     def get_recommendations(self, analysis_result):
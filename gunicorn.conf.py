@@ -2,6 +2,7 @@
 Gunicorn 설정 파일
 """
 import os
+import sys
 import multiprocessing
 
 # 서버 소켓
@@ -20,6 +21,9 @@ max_requests = 1000
 max_requests_jitter = 100
 preload_app = True
 
+# preload 시 마스터는 체크포인트를 가져가지 않고 post_fork에서 워커마다 재개
+os.environ.setdefault('LOTTO_MD_DEFER_RESUME', '1')
+
 # 로깅
 accesslog = "-"
 errorlog = "-"
@@ -36,3 +40,11 @@ limit_request_field_size = 8190
 
 # 성능 튜닝
 worker_tmp_dir = "/dev/shm"
+
+# 워커 시작 훅
+def post_fork(server, worker):
+    """재시작된 워커가 최신 체크포인트에서 분자 시뮬레이션을 이어받도록 함"""
+    # preload_app 사용 시 rng는 마스터에서 생성되므로 워커마다 다시 재개해야 함
+    rng = getattr(sys.modules.get('app'), 'rng', None)
+    if rng is not None and hasattr(rng, 'resume_from_checkpoint'):
+        rng.resume_from_checkpoint()
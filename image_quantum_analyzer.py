@@ -1,3 +1,14 @@
+import argparse
+import base64
+import hashlib
+import io
+import json
+import multiprocessing as mp
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, as_completed, wait
 import numpy as np
 
 # 안전한 import 처리
@@ -16,9 +27,11 @@ except ImportError:
     print("Warning: PIL not available. Image analysis will be limited.")
 
 try:
+    from scipy import fft as sfft
     from scipy.fftpack import dct, idct
     SCIPY_AVAILABLE = True
 except ImportError:
+    sfft = None
     SCIPY_AVAILABLE = False
     print("Warning: SciPy not available. Using numpy alternatives.")
     # numpy 대체 함수들
@@ -28,13 +41,234 @@ except ImportError:
     def idct(x, type=2, n=None, axis=-1):
         return np.fft.ifft(x, axis=axis).real
 
+from config import IMAGE_ANALYSIS_CONFIG as CONFIG
+
+HISTORY_POLICIES = ('none', 'last_k', 'summary')
+# Per-extraction statistics kept in the fixed-size summary ring
+SUMMARY_FIELDS = ('entropy', 'entanglement_entropy', 'coherence', 'interference_mean')
+
+def _randomized_singular_values(matrix, rank, oversample=10, power_iterations=2):
+    """Leading singular values via a randomized range finder (Halko et al.)"""
+    rng = np.random.default_rng(0)
+    k = min(rank + oversample, min(matrix.shape))
+    Q, _ = np.linalg.qr(matrix @ rng.standard_normal((matrix.shape[1], k)))
+    for _ in range(power_iterations):
+        Q, _ = np.linalg.qr(matrix.T @ Q)
+        Q, _ = np.linalg.qr(matrix @ Q)
+    return np.linalg.svd(Q.T @ matrix, compute_uv=False)[:rank]
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp', '.tif', '.tiff')
+
+# 배치 워커 프로세스마다 하나씩 만드는 분석기 (이력 보관 없음)
+_worker_analyzer = None
+
+def _extract_one(analyzer, index, source, max_side):
+    """경로 또는 바이트 하나를 디코딩, 축소, 특징 추출 (오류는 결과에 기록)"""
+    label = source if isinstance(source, str) else None
+    try:
+        if isinstance(source, str):
+            with open(source, 'rb') as f:
+                source = f.read()
+        return {'index': index, 'source': label, 'bytes': len(source),
+                'features': analyzer.analyze_upload(source, max_side)}
+    except Exception as e:
+        return {'index': index, 'source': label, 'error': str(e)}
+
+def _extract_worker(index, source, max_side):
+    """프로세스 풀 작업: 워커 전용 분석기로 _extract_one 실행"""
+    global _worker_analyzer
+    if _worker_analyzer is None:
+        _worker_analyzer = ImageQuantumAnalyzer(history_policy='none')
+        # 병렬성은 프로세스 단위: 프로세스마다 전 코어 FFT 스레드를 띄우지 않음
+        _worker_analyzer.fft_workers = 1
+    return _extract_one(_worker_analyzer, index, source, max_side)
+
+def _mtime(entry):
+    """Modification time of a directory entry, or 0 if it was removed meanwhile"""
+    try:
+        return entry.stat().st_mtime
+    except OSError:
+        return 0
+
+class FeatureCache:
+    """Content-addressed LRU of compact image features with an optional .npz disk tier
+    
+    The disk tier is bounded too: files are touched on every hit and the
+    least recently used ones are removed once `max_disk_entries` is exceeded.
+    It is best-effort: disk errors are counted and the memory tier still serves.
+    """
+    
+    def __init__(self, max_entries=None, disk_dir=None, max_disk_entries=None):
+        self.max_entries = max_entries if max_entries is not None else CONFIG['feature_cache_size']
+        self.max_disk_entries = (max_disk_entries if max_disk_entries is not None
+                                 else CONFIG['feature_cache_disk_size'])
+        self.disk_dir = disk_dir if disk_dir is not None else CONFIG['feature_cache_dir']
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.disk_evictions = 0
+        self.disk_errors = 0
+        if self.disk_dir:
+            try:
+                os.makedirs(self.disk_dir, exist_ok=True)
+            except OSError as e:
+                # 디스크 계층 없이 메모리 캐시만 사용
+                print(f"Warning: feature cache disk tier disabled: {e}")
+                self.disk_dir = None
+                self.disk_errors += 1
+        
+    @staticmethod
+    def make_key(kind, data, **params):
+        """SHA-256 over the feature kind, the content and the preprocessing parameters"""
+        digest = hashlib.sha256(kind.encode())
+        if isinstance(data, np.ndarray):
+            digest.update(f'{data.shape}{data.dtype}'.encode())
+            data = np.ascontiguousarray(data)
+        digest.update(memoryview(data).cast('B'))
+        digest.update(repr(sorted(params.items())).encode())
+        return digest.hexdigest()
+        
+    def _path(self, key):
+        return os.path.join(self.disk_dir, f'{key}.npz')
+        
+    def get(self, key):
+        with self._lock:
+            features = self._entries.get(key)
+            if features is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return features
+                
+        if self.disk_dir and os.path.exists(self._path(key)):
+            try:
+                with np.load(self._path(key)) as stored:
+                    features = self._restore(stored)
+                # 디스크 LRU 순서는 수정 시각으로 관리
+                os.utime(self._path(key))
+            except (OSError, ValueError):
+                features = None
+            if features is not None:
+                self._remember(key, features)
+                with self._lock:
+                    self.hits += 1
+                return features
+                
+        with self._lock:
+            self.misses += 1
+        return None
+        
+    def put(self, key, features):
+        self._remember(key, features)
+        if self.disk_dir:
+            # 원자적 교체로 동시 쓰기 중 손상된 파일을 읽지 않도록
+            tmp_path = self._path(key) + f'.{os.getpid()}.tmp'
+            lists = [name for name, value in features.items() if isinstance(value, list)]
+            try:
+                with open(tmp_path, 'wb') as f:
+                    np.savez(f, _list_fields=np.array(lists, dtype=str), **features)
+                os.replace(tmp_path, self._path(key))
+            except OSError:
+                # 디스크 부족, 읽기 전용 등: 메모리 계층만으로 계속 서비스
+                with self._lock:
+                    self.disk_errors += 1
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+                return
+            self._prune_disk()
+            
+    def _prune_disk(self):
+        """Remove the least recently used .npz files beyond max_disk_entries"""
+        try:
+            entries = [entry for entry in os.scandir(self.disk_dir)
+                       if entry.name.endswith('.npz') and entry.is_file()]
+        except OSError:
+            with self._lock:
+                self.disk_errors += 1
+            return
+        excess = len(entries) - self.max_disk_entries
+        if excess <= 0:
+            return
+        entries.sort(key=_mtime)
+        for entry in entries[:excess]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                # 다른 프로세스가 이미 제거함
+                continue
+            with self._lock:
+                self.disk_evictions += 1
+            
+    def _remember(self, key, features):
+        with self._lock:
+            self._entries[key] = features
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                
+    @staticmethod
+    def _restore(stored):
+        """Rebuild a features dict from .npz, with lists and scalars as they were put"""
+        lists = set(stored['_list_fields'].tolist()) if '_list_fields' in stored.files else set()
+        features = {}
+        for name in stored.files:
+            if name == '_list_fields':
+                continue
+            value = stored[name]
+            if name in lists:
+                features[name] = value.tolist()
+            else:
+                features[name] = value.item() if value.ndim == 0 else value
+        return features
+        
+    def get_stats(self):
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'disk_dir': self.disk_dir,
+                'max_disk_size': self.max_disk_entries,
+                'disk_evictions': self.disk_evictions,
+                'disk_errors': self.disk_errors
+            }
+            
 class ImageQuantumAnalyzer:
-    def __init__(self):
-        self.quantum_states = []
-        self.wave_functions = []
+    def __init__(self, feature_cache=None, history_policy=None, history_size=None):
+        self.history_policy = history_policy or CONFIG['history_policy']
+        if self.history_policy not in HISTORY_POLICIES:
+            raise ValueError(f"history_policy must be one of {HISTORY_POLICIES}")
+        self.history_size = history_size if history_size is not None else CONFIG['history_size']
         
-    def load_image(self, image_path):
-        """이미지 로드 및 전처리"""
+        # 전체 배열은 'last_k' 일 때만 최근 k개 보관 (그 외에는 maxlen=0)
+        keep = self.history_size if self.history_policy == 'last_k' else 0
+        self.quantum_states = deque(maxlen=keep)
+        self.wave_functions = deque(maxlen=keep)
+        
+        # 요약 통계는 고정 크기 링 버퍼
+        self.feature_summaries = np.zeros((self.history_size, len(SUMMARY_FIELDS)))
+        self.summary_count = 0
+        self._history_lock = threading.Lock()
+        
+        # FFT 스레드 수와 스레드별 작업 버퍼 (같은 크기 호출 간 재사용)
+        self.fft_workers = CONFIG['fft_workers']
+        self._scratch = threading.local()
+        self.feature_cache = feature_cache if feature_cache is not None else FeatureCache()
+        
+    def load_image(self, image_path, max_side=None):
+        """이미지 로드 및 전처리 (피라미드 축소 후 정규화)"""
+        if not isinstance(image_path, str) or image_path.startswith('data:'):
+            # 바이트, base64, 파일 객체는 메모리에서 바로 디코딩
+            return self.decode_image(image_path, max_side)
+        if not os.path.exists(image_path):
+            # 접두어 없는 base64 문자열도 경로가 아니면 메모리 디코딩 시도
+            try:
+                return self.decode_image(image_path, max_side)
+            except (ValueError, TypeError):
+                pass
         try:
             if CV2_AVAILABLE:
                 # OpenCV로 이미지 로드
@@ -55,6 +289,9 @@ class ImageQuantumAnalyzer:
                 print("Warning: No image library available, using random data")
                 img = np.random.rand(100, 100, 3)
                 
+            # 원본 해상도는 스펙트럼 분석에 불필요: 정규화 전에 축소
+            img = self.downsample(img, max_side)
+            
             # 정규화
             if img.max() > 1:
                 img = img / 255.0
@@ -65,54 +302,301 @@ class ImageQuantumAnalyzer:
             # 대체 이미지 반환
             return np.random.rand(100, 100, 3)
             
+    def decode_image(self, source, max_side=None, normalize=True):
+        """바이트 / base64 문자열 / 파일 객체에서 임시 파일 없이 이미지 디코딩
+        
+        uint8 로 디코딩하고 피라미드 축소를 마친 뒤에만 정규화한다.
+        normalize=False 면 축소된 uint8 배열을 그대로 반환한다.
+        """
+        if hasattr(source, 'read'):
+            source = source.read()
+        if isinstance(source, str):
+            # data URL 접두어 (data:image/jpeg;base64,...) 제거 후 base64 디코딩
+            source = base64.b64decode(source.split(',', 1)[1] if source.startswith('data:') else source)
+        buffer = memoryview(source)
+        max_side = max_side or CONFIG['max_side']
+        
+        img = None
+        if PIL_AVAILABLE:
+            try:
+                pil_image = Image.open(io.BytesIO(buffer))
+                if max_side:
+                    # JPEG 는 DCT 단계에서 1/2, 1/4, 1/8 로 축소 디코딩
+                    pil_image.draft('RGB', (max_side, max_side))
+                img = np.asarray(pil_image.convert('RGB'))
+            except Exception:
+                img = None
+        if img is None and CV2_AVAILABLE:
+            img = cv2.imdecode(np.frombuffer(buffer, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if img is not None:
+                img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+        if img is None:
+            raise ValueError("이미지를 디코딩할 수 없습니다.")
+            
+        img = self.downsample(img, max_side)
+        if normalize:
+            img = img / 255.0
+        return img
+        
+    @staticmethod
+    def _pyramid_down(image):
+        """2x2 면적 평균으로 한 단계 축소 (dtype 유지)"""
+        h, w = image.shape[0] // 2, image.shape[1] // 2
+        if CV2_AVAILABLE and image.dtype in (np.uint8, np.uint16, np.float32, np.float64):
+            return cv2.resize(image, (w, h), interpolation=cv2.INTER_AREA)
+        blocks = image[:2*h, :2*w].reshape(h, 2, w, 2, *image.shape[2:])
+        if np.issubdtype(image.dtype, np.integer):
+            # 정수 영상은 반올림 평균으로 dtype 유지
+            return ((blocks.sum(axis=(1, 3), dtype=np.uint32) + 2) // 4).astype(image.dtype)
+        return blocks.mean(axis=(1, 3))
+        
+    def build_pyramid(self, image, max_side=None):
+        """원본부터 최대 변이 max_side 이하가 될 때까지의 면적 평균 피라미드"""
+        max_side = max_side or CONFIG['max_side']
+        levels = [image]
+        while max_side and max(levels[-1].shape[:2]) > max_side and min(levels[-1].shape[:2]) >= 2:
+            levels.append(self._pyramid_down(levels[-1]))
+        return levels
+        
+    def downsample(self, image, max_side=None):
+        """피라미드의 마지막 단계만 반환 (중간 단계는 보관하지 않음)"""
+        max_side = max_side or CONFIG['max_side']
+        while max_side and max(image.shape[:2]) > max_side and min(image.shape[:2]) >= 2:
+            image = self._pyramid_down(image)
+        return image
+        
+    def iter_tiles(self, image, tile_size=None):
+        """원본 해상도의 타일 (행, 열, 타일) 순회"""
+        tile_size = tile_size or CONFIG['tile_size']
+        for top in range(0, image.shape[0], tile_size):
+            for left in range(0, image.shape[1], tile_size):
+                yield top, left, image[top:top + tile_size, left:left + tile_size]
+                
+    def extract_tiled_features(self, image, tile_size=None):
+        """해상도에 의존하는 특징을 타일 단위로 추출 (메모리는 타일 크기에 비례)"""
+        tiles = []
+        for top, left, tile in self.iter_tiles(image, tile_size):
+            if tile.dtype == np.uint8:
+                tile = tile / 255.0
+            quantum_state = self._image_to_quantum_state(tile)
+            wave_function = self._calculate_wave_function(quantum_state)
+            tiles.append({
+                'row': top,
+                'col': left,
+                'entropy': self._calculate_quantum_entropy(quantum_state),
+                'entanglement_entropy': self._calculate_entanglement_entropy(quantum_state),
+                'coherence': self._calculate_coherence(wave_function)
+            })
+        return tiles
+        
+    def analyze_upload(self, source, max_side=None):
+        """업로드 원본 바이트 기준 캐시: 같은 사진이면 디코딩부터 전부 생략"""
+        if hasattr(source, 'read'):
+            source = source.read()
+        raw = source.encode() if isinstance(source, str) else source
+        max_side = max_side or CONFIG['max_side']
+        key = FeatureCache.make_key('upload', raw, max_side=max_side,
+                                    summary_side=CONFIG['interference_summary_side'])
+        cached = self.feature_cache.get(key)
+        if cached is not None:
+            return cached
+            
+        # 업로드 한 건은 캐시 항목 하나: 픽셀 기준 'quantum'/'entropy' 캐시는 거치지 않음
+        image = self.decode_image(source, max_side, normalize=False)
+        features = dict(self._extract_quantum_features(image / 255.0))
+        self._record_summary(features)
+        features.update(self._analyze_image_entropy(image))
+        features.update({'height': image.shape[0], 'width': image.shape[1]})
+        self.feature_cache.put(key, features)
+        return features
+        
+    def extract_batch(self, paths_or_buffers, workers=None, max_side=None):
+        """여러 이미지 (경로 또는 바이트) 의 특징을 프로세스 풀에서 추출
+        
+        완료되는 순서대로 {'index', 'source', 'bytes', 'features' | 'error'} 를
+        yield 한다. 입력은 작업자 수의 2배까지만 미리 제출해 메모리를 제한한다.
+        """
+        workers = workers or os.cpu_count() or 1
+        items = enumerate(paths_or_buffers)
+        
+        if workers <= 1:
+            # 프로세스 없이 이 분석기의 캐시와 이력 정책을 그대로 사용
+            for index, source in items:
+                yield _extract_one(self, index, source, max_side)
+            return
+            
+        ctx = mp.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+            pending = set()
+            for index, source in items:
+                pending.add(pool.submit(_extract_worker, index, source, max_side))
+                if len(pending) >= 2 * workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
+            for future in as_completed(pending):
+                yield future.result()
+                
     def extract_quantum_features(self, image):
-        """이미지에서 양자 특징 추출"""
+        """이미지에서 양자 특징 추출 (픽셀 내용 기준 캐시)"""
+        key = FeatureCache.make_key('quantum', image,
+                                    summary_side=CONFIG['interference_summary_side'])
+        features = self.feature_cache.get(key)
+        if features is None:
+            features = self._extract_quantum_features(image)
+            self.feature_cache.put(key, features)
+            
+        self._record_summary(features)
+        return features
+        
+    def _record_summary(self, features):
+        if self.history_policy == 'none' or self.history_size == 0:
+            return
+        summary = (features['entropy'], features['entanglement_entropy'],
+                   features['coherence'], np.mean(features['interference_profile']))
+        with self._history_lock:
+            self.feature_summaries[self.summary_count % self.history_size] = summary
+            self.summary_count += 1
+        
+    def get_history_summary(self):
+        """보관 중인 요약 통계 (오래된 것부터)"""
+        with self._history_lock:
+            total = self.summary_count
+            count = min(total, self.history_size)
+            rows = self.feature_summaries[np.arange(total - count, total) % max(self.history_size, 1)]
+        return {
+            'count': total,
+            'policy': self.history_policy,
+            **{field: rows[:, i] for i, field in enumerate(SUMMARY_FIELDS)}
+        }
+        
+    def _summarize_interference(self, pattern):
+        """간섭 패턴의 면적 평균 축소본과 정확한 축별 평균 프로파일"""
+        return {
+            'interference': self.downsample(pattern, CONFIG['interference_summary_side']),
+            'interference_profile': np.mean(pattern, axis=(0, 1))
+        }
+        
+    def _extract_quantum_features(self, image):
         # 이미지를 양자 상태로 변환
         quantum_state = self._image_to_quantum_state(image)
         self.quantum_states.append(quantum_state)
         
-        # 파동 함수 계산
-        wave_function = self._calculate_wave_function(quantum_state)
-        self.wave_functions.append(wave_function)
+        # 파동 함수는 전체 배열 이력을 보관할 때만 계산
+        # (결맞음과 간섭 패턴은 양자 상태에서 FFT 없이 바로 계산)
+        if self.wave_functions.maxlen:
+            self.wave_functions.append(self._calculate_wave_function(quantum_state))
         
         # 특징 추출
         features = {
             'entropy': self._calculate_quantum_entropy(quantum_state),
-            'coherence': self._calculate_coherence(wave_function),
-            'interference': self._calculate_interference_pattern(wave_function)
+            'entanglement_entropy': self._calculate_entanglement_entropy(quantum_state),
+            'coherence': self._coherence_from_state(quantum_state)
         }
+        # 전체 간섭 패턴 대신 요약만 보관 (캐시 항목 크기 제한)
+        features.update(self._summarize_interference(
+            self._interference_from_state(quantum_state)))
         
         return features
         
+    def _scratch_buffer(self, shape):
+        """스레드별로 모양이 같은 호출 간 재사용하는 float64 작업 버퍼"""
+        buffer = getattr(self._scratch, 'buffer', None)
+        if buffer is None or buffer.shape != shape:
+            buffer = self._scratch.buffer = np.empty(shape)
+        return buffer
+        
+    def _coherence_from_state(self, quantum_state):
+        """_calculate_coherence(_calculate_wave_function(x)) 의 닫힌 형태
+        
+        마지막 두 축의 DFT 계수 합은 n * x[..., 0, 0] 이고 Parseval 정리로
+        |psi| 정규화 상수도 x 에서 바로 구할 수 있다.
+        """
+        n = quantum_state.shape[-2] * quantum_state.shape[-1]
+        norm = np.sqrt(n * np.sum(quantum_state**2))
+        return n * np.abs(np.sum(quantum_state[..., 0, 0])) / (quantum_state.size * norm)
+        
+    def _interference_from_state(self, quantum_state):
+        """_calculate_interference_pattern(_calculate_wave_function(x)) 의 닫힌 형태
+        
+        FFT 를 두 번 적용하면 F(F(x))[k] = n * x[-k] 이므로 두 번의 fft2 없이
+        인덱스를 뒤집은 상태의 제곱으로 간섭 패턴을 얻는다.
+        """
+        n = quantum_state.shape[-2] * quantum_state.shape[-1]
+        pattern = self._scratch_buffer(quantum_state.shape)
+        np.square(quantum_state[..., ::-1, ::-1], out=pattern)
+        pattern *= n / np.sum(quantum_state**2)
+        # x[-k] 는 뒤집은 배열을 한 칸 회전한 것: 원래의 fftshift (모든 축) 와 합쳐 한 번에 회전
+        shifts = [size // 2 for size in pattern.shape]
+        shifts[-2] += 1
+        shifts[-1] += 1
+        return np.roll(pattern, shifts, axis=tuple(range(pattern.ndim)))
+        
     def _image_to_quantum_state(self, image):
         """이미지를 양자 상태로 변환"""
-        # 2D DCT 변환 수행
-        dct_image = dct(dct(image.T, norm='ortho').T, norm='ortho')
+        # 2D DCT 변환 수행 (첫 축과 마지막 축, 기존 dct(dct(image.T).T) 와 동일)
+        if sfft is not None:
+            dct_image = sfft.dctn(image, axes=(0, image.ndim - 1), norm='ortho',
+                                  workers=self.fft_workers)
+        else:
+            dct_image = dct(dct(image.T, norm='ortho').T, norm='ortho')
         
-        # 정규화된 양자 상태로 변환
-        quantum_state = np.abs(dct_image) / np.sqrt(np.sum(np.abs(dct_image)**2))
+        # 정규화된 양자 상태로 변환 (새 배열이므로 제자리 연산)
+        quantum_state = np.abs(dct_image, out=dct_image)
+        quantum_state /= np.sqrt(np.sum(quantum_state**2))
         
         return quantum_state
         
     def _calculate_wave_function(self, quantum_state):
         """양자 상태의 파동 함수 계산"""
         # Schrödinger 방정식의 간단한 근사 해
-        psi = np.fft.fft2(quantum_state)
-        psi = psi / np.sqrt(np.sum(np.abs(psi)**2))
+        if sfft is not None:
+            # 실수 입력은 scipy.fft 내부에서 r2c 로 절반만 계산한 뒤 대칭으로 채움
+            psi = sfft.fft2(quantum_state, workers=self.fft_workers)
+        else:
+            psi = np.fft.fft2(quantum_state)
+        # Parseval: sum|psi|^2 = n * sum|x|^2
+        n = quantum_state.shape[-2] * quantum_state.shape[-1]
+        psi /= np.sqrt(n * np.sum(np.abs(quantum_state)**2))
         
         return psi
         
     def _calculate_quantum_entropy(self, quantum_state):
         """양자 상태의 von Neumann 엔트로피 계산"""
-        # 밀도 행렬의 고유값 계산
-        rho = np.outer(quantum_state.flatten(), quantum_state.flatten().conj())
-        eigenvalues = np.real(np.linalg.eigvals(rho))
-        eigenvalues = eigenvalues[eigenvalues > 0]
+        # rho = |psi><psi| 는 랭크 1: 0이 아닌 고유값은 <psi|psi> 하나뿐이므로
+        # N x N 밀도 행렬을 만들지 않고 닫힌 형태로 계산
+        eigenvalue = float(np.real(np.vdot(quantum_state, quantum_state)))
+        if eigenvalue <= 0:
+            return 0.0
         
         # von Neumann 엔트로피 계산
-        entropy = -np.sum(eigenvalues * np.log2(eigenvalues))
+        entropy = -eigenvalue * np.log2(eigenvalue)
         return entropy
         
+    def _calculate_entanglement_entropy(self, quantum_state):
+        """행(세로) / 나머지 축 분할에 대한 축약 밀도 행렬의 엔트로피"""
+        # 축약 밀도 행렬 rho_A = M M^T 의 고유값은 M 의 특이값 제곱
+        matrix = quantum_state.reshape(quantum_state.shape[0], -1)
+        total = float(np.sum(matrix * matrix))
+        if total <= 0:
+            return 0.0
+        dim = min(matrix.shape)
+        
+        if dim <= CONFIG['entropy_exact_max_dim']:
+            eigenvalues = np.linalg.svd(matrix, compute_uv=False)**2 / total
+            residual = 0.0
+        else:
+            # 큰 상태: 상위 k개 고유값만 근사하고 남은 확률은 나머지에 균등 분배
+            rank = CONFIG['entropy_rank']
+            eigenvalues = _randomized_singular_values(matrix, rank)**2 / total
+            residual = max(1.0 - float(np.sum(eigenvalues)), 0.0)
+            
+        eigenvalues = eigenvalues[eigenvalues > 0]
+        entropy = -np.sum(eigenvalues * np.log2(eigenvalues))
+        if residual > 0:
+            entropy -= residual * np.log2(residual / (dim - len(eigenvalues)))
+        return float(entropy)
+        
     def _calculate_coherence(self, wave_function):
         """양자 결맞음 계산"""
         # 파동 함수의 위상 간섭 효과 측정
@@ -122,38 +606,93 @@ class ImageQuantumAnalyzer:
     def _calculate_interference_pattern(self, wave_function):
         """간섭 패턴 분석"""
         # 이중 슬릿 실험과 유사한 간섭 패턴 계산
-        pattern = np.abs(np.fft.fftshift(np.fft.fft2(wave_function)))**2
+        spectrum = sfft.fft2(wave_function, workers=self.fft_workers) if sfft is not None \
+            else np.fft.fft2(wave_function)
+        pattern = np.abs(np.fft.fftshift(spectrum))**2
         return pattern
         
-    def generate_numbers(self, features, n=6, max_num=45):
-        """양자 특징을 기반으로 로또 번호 생성"""
-        numbers = []
+    def _number_probabilities(self, features, max_num):
+        """결맞음과 간섭 패턴을 사용한 번호별 확률 분포"""
+        weights = np.ravel(features.get('interference_profile', np.nan))
+        if weights.size != max_num or not np.all(np.isfinite(weights)):
+            # 프로파일 길이가 번호 수와 다르면 (RGB 는 3, 흑백은 스칼라)
+            # 간섭 패턴 요약을 번호 수만큼의 구간 평균으로 재표본화
+            summary = np.ravel(np.asarray(features['interference'], dtype=float))
+            if summary.size >= max_num:
+                starts = np.linspace(0, summary.size, max_num, endpoint=False).astype(int)
+                weights = np.add.reduceat(summary, starts) / np.diff(np.append(starts, summary.size))
+            else:
+                weights = np.interp(np.linspace(0, summary.size - 1, max_num),
+                                    np.arange(summary.size), summary)
+                
+        probs = weights * features['coherence']
+        total = np.sum(probs)
+        if not np.isfinite(total) or total <= 0:
+            return np.full(max_num, 1.0 / max_num)
+        return probs / total
         
-        # 엔트로피를 사용한 초기 시드 생성
-        np.random.seed(int(features['entropy'] * 1e6))
+    def _feature_rng(self, features):
+        """특징값으로 시드한 지역 Generator (전역 np.random 상태를 건드리지 않음)"""
+        seed = [abs(int(features['entropy'] * 1e6)),
+                abs(int(features.get('entanglement_entropy', 0.0) * 1e6))]
+        return np.random.default_rng(seed)
         
-        # 결맞음과 간섭 패턴을 사용한 확률 분포 생성
-        coherence = features['coherence']
-        interference = np.mean(features['interference'], axis=(0,1))
+    def generate_batch(self, features, count, n=6, max_num=45, rng=None):
+        """같은 특징에서 티켓 count 장을 한 번에 생성 (Gumbel top-k)
         
-        # 확률 분포 계산
-        probs = interference * coherence
-        probs = probs / np.sum(probs)
+        log p + Gumbel 잡음의 상위 n 개는 확률 p 에 비례한 비복원 추출과
+        같은 분포이므로, 중복 거절 반복 없이 모든 티켓을 한 번에 뽑는다.
+        """
+        rng = rng if rng is not None else self._feature_rng(features)
+        probs = self._number_probabilities(features, max_num)
         
-        # 번호 선택
-        while len(numbers) < n:
-            num = np.random.choice(range(1, max_num+1), p=probs/np.sum(probs))
-            if num not in numbers:
-                numbers.append(num)
-                
-        return sorted(numbers)
+        with np.errstate(divide='ignore'):
+            keys = np.log(probs) + rng.gumbel(size=(count, max_num))
+        chosen = np.argpartition(keys, -n, axis=1)[:, -n:]
+        return (np.sort(chosen, axis=1) + 1).tolist()
+        
+    def generate_numbers(self, features, n=6, max_num=45, rng=None):
+        """양자 특징을 기반으로 로또 번호 생성"""
+        return self.generate_batch(features, 1, n, max_num, rng)[0]
         
     def analyze_image_entropy(self, image):
-        """이미지 엔트로피 분석"""
+        """이미지 엔트로피 분석 (픽셀 내용 기준 캐시)"""
+        key = FeatureCache.make_key('entropy', image)
+        cached = self.feature_cache.get(key)
+        if cached is not None:
+            return cached
+            
+        result = self._analyze_image_entropy(image)
+        self.feature_cache.put(key, result)
+        return result
+        
+    def _analyze_image_entropy(self, image):
+        if image.dtype == np.uint8 and image.ndim == 3:
+            entropies = self._channel_entropies_uint8(image)
+        else:
+            entropies = self._channel_entropies_float(image)
+            
+        return {
+            'total_entropy': np.mean(entropies),
+            'channel_entropies': entropies,
+            'complexity': np.std(entropies)
+        }
+        
+    @staticmethod
+    def _channel_entropies_uint8(image):
+        """uint8 영상의 RGB 히스토그램 3개를 bincount 한 번으로 계산"""
+        # channel*256 + value 로 세 채널의 구간을 이어 붙임 (부동소수 변환 없음)
+        index = image[..., :3].astype(np.uint16)
+        index += np.arange(0, 768, 256, dtype=np.uint16)
+        hist = np.bincount(index.reshape(-1), minlength=768).reshape(3, 256)
+        hist = hist / hist.sum(axis=1, keepdims=True)
+        return (-np.sum(hist * np.log2(hist + 1e-7), axis=1)).tolist()
+        
+    def _channel_entropies_float(self, image):
         # 컬러 채널별 엔트로피 계산
         entropies = []
         for channel in range(3):  # RGB
-            if CV2_AVAILABLE:
+            if CV2_AVAILABLE and image.dtype == np.float32:
                 hist = cv2.calcHist([image], [channel], None, [256], [0, 1])
                 hist = hist / hist.sum()
             else:
@@ -166,8 +705,50 @@ class ImageQuantumAnalyzer:
             entropy = -np.sum(hist * np.log2(hist + 1e-7))
             entropies.append(entropy)
             
-        return {
-            'total_entropy': np.mean(entropies),
-            'channel_entropies': entropies,
-            'complexity': np.std(entropies)
-        }
+        return entropies
+
+
+def main():
+    """이미지 폴더의 양자 특징을 일괄 추출하고 처리량을 보고"""
+    parser = argparse.ArgumentParser(description='이미지 폴더 양자 특징 일괄 추출')
+    parser.add_argument('folder', help='이미지 폴더 경로')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                       help='프로세스 수')
+    parser.add_argument('--max-side', type=int, default=None,
+                       help='스펙트럼 분석 전 최대 변 길이')
+    parser.add_argument('--output', default=None,
+                       help='스칼라 특징을 저장할 JSON Lines 파일')
+    args = parser.parse_args()
+    
+    paths = sorted(os.path.join(root, name)
+                   for root, _, names in os.walk(args.folder)
+                   for name in names if name.lower().endswith(IMAGE_EXTENSIONS))
+    print(f"이미지 {len(paths)}개, 프로세스 {args.workers}개")
+    
+    analyzer = ImageQuantumAnalyzer(history_policy='none')
+    output = open(args.output, 'w', encoding='utf-8') if args.output else None
+    start = time.time()
+    processed = failed = total_bytes = 0
+    try:
+        for result in analyzer.extract_batch(paths, workers=args.workers, max_side=args.max_side):
+            if 'error' in result:
+                failed += 1
+                print(f"실패: {result['source']}: {result['error']}")
+                continue
+            processed += 1
+            total_bytes += result['bytes']
+            if output:
+                scalars = {key: np.asarray(value).item() for key, value in result['features'].items()
+                           if np.ndim(value) == 0}
+                output.write(json.dumps({'source': result['source'], **scalars}) + '\n')
+    finally:
+        if output:
+            output.close()
+            
+    elapsed = max(time.time() - start, 1e-9)
+    print(f"처리 {processed}개, 실패 {failed}개, {elapsed:.2f}초")
+    print(f"처리량: {processed / elapsed:.1f} 이미지/초, {total_bytes / elapsed / 1024 / 1024:.1f} MB/초")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,56 +1,150 @@
+import os
+import glob
+import time
+import threading
+import multiprocessing as mp
+from multiprocessing import shared_memory
 import numpy as np
 from config import MOLECULAR_SIMULATION_CONFIG as CONFIG
+from entropy_analyzer import EntropyDriftAnalyzer
+
+# 안전한 import 처리 (psutil은 선택적 의존성)
+try:
+    from utils.memory_manager import MemoryMonitor
+except ImportError:
+    MemoryMonitor = None
 
 class JacksonHwangRNG:
-    def __init__(self):
-        self.num_particles = CONFIG['num_particles']
+    def __init__(self, num_particles=None, equilibrium_steps=None, checkpoint_dir=None, dtype=None,
+                 resume=None):
+        self.num_particles = num_particles or CONFIG['num_particles']
         self.temperature = CONFIG['temperature']
         self.pressure = CONFIG['pressure']
         self.time_step = CONFIG['time_step']
-        self.equilibrium_steps = CONFIG['equilibrium_steps']
+        self.equilibrium_steps = equilibrium_steps if equilibrium_steps is not None else CONFIG['equilibrium_steps']
+        self.decorrelation_steps = CONFIG['decorrelation_steps']
+        self.early_stopping = CONFIG['early_stopping']
+        self.convergence_check_interval = CONFIG['convergence_check_interval']
+        self.convergence_window = CONFIG['convergence_window']
+        self.convergence_tolerance = CONFIG['convergence_tolerance']
+        self.checkpoint_dir = checkpoint_dir or CONFIG['checkpoint_dir']
+        self.checkpoint_interval = CONFIG['checkpoint_interval']
+        self.total_steps = 0
+        
+        # Storage precision for particle arrays; forces and energies accumulate in float64
+        self.dtype = np.dtype(dtype or CONFIG['dtype'])
+        self.force_chunk_size = CONFIG['force_chunk_size']
+        self._scratch = None
+        self.memory_monitor = MemoryMonitor() if MemoryMonitor else None
         
         # Initialize particle states
-        self.positions = np.random.rand(self.num_particles, 3)
-        self.velocities = np.random.normal(0, np.sqrt(self.temperature), (self.num_particles, 3))
-        self.masses = np.ones(self.num_particles)
-        
-    def calculate_forces(self):
-        """Lennard-Jones potential for molecular interactions"""
-        forces = np.zeros((self.num_particles, 3))
-        for i in range(self.num_particles):
-            for j in range(i + 1, self.num_particles):
-                r = self.positions[j] - self.positions[i]
-                r_mag = np.linalg.norm(r)
-                
-                # Avoid division by zero
-                if r_mag < 1e-10:
-                    continue
-                    
-                # Lennard-Jones force calculation
-                f_mag = 24 * (2 * (1/r_mag)**13 - (1/r_mag)**7)
-                f = f_mag * r / r_mag
-                
-                forces[i] += f
-                forces[j] -= f
-                
+        self.positions = np.random.rand(self.num_particles, 3).astype(self.dtype)
+        self.velocities = np.random.normal(0, np.sqrt(self.temperature), (self.num_particles, 3)).astype(self.dtype)
+        self.masses = np.ones(self.num_particles, dtype=self.dtype)
+        
+        # Quality report of the most recent generation
+        self.last_run_info = None
+        
+        # Equilibration steps used vs budgeted, across all generations
+        self.equilibration_stats = {'runs': 0, 'converged_runs': 0, 'steps_used': 0, 'steps_budgeted': 0}
+        
+        # Warm start from the latest checkpoint left by a previous worker
+        # (skipped when a post-fork hook resumes in each worker instead)
+        self.resumed_from = None
+        resume = CONFIG['resume_on_init'] if resume is None else resume
+        if self.checkpoint_dir and resume:
+            self.resume_from_checkpoint()
+        
+    def _get_scratch(self):
+        """Preallocated buffers reused by every integration step"""
+        n = self.num_particles
+        if self._scratch is None or self._scratch['num_particles'] != n:
+            chunk = min(self.force_chunk_size, n)
+            self._scratch = {
+                'num_particles': n,
+                'separations': np.empty((chunk, n, 3), dtype=self.dtype),
+                'inv_r': np.empty((chunk, n)),
+                'work': np.empty((chunk, n)),
+                'near': np.empty((chunk, n), dtype=bool),
+                'forces': np.empty((n, 3)),
+                'new_forces': np.empty((n, 3)),
+                'step': np.empty((n, 3)),
+                'delta': np.empty((n, 3))
+            }
+        return self._scratch
+        
+    def calculate_forces(self, out=None):
+        """Lennard-Jones potential for molecular interactions
+        
+        Pair terms are evaluated for `force_chunk_size` particles at a time
+        against all others, using the preallocated (chunk, N, 3) scratch.
+        """
+        scratch = self._get_scratch()
+        forces = out if out is not None else np.empty((self.num_particles, 3))
+        positions = self.positions
+        
+        for start in range(0, self.num_particles, self.force_chunk_size):
+            stop = min(start + self.force_chunk_size, self.num_particles)
+            rows = stop - start
+            r = scratch['separations'][:rows]
+            inv_r = scratch['inv_r'][:rows]
+            work = scratch['work'][:rows]
+            near = scratch['near'][:rows]
+            
+            # r_ij = x_j - x_i and its magnitude (float64)
+            np.subtract(positions[np.newaxis, :, :], positions[start:stop, np.newaxis, :], out=r)
+            np.einsum('ijk,ijk->ij', r, r, out=inv_r, dtype=np.float64)
+            np.sqrt(inv_r, out=inv_r)
+            
+            # Avoid division by zero (self pairs and overlapping particles)
+            np.less(inv_r, 1e-10, out=near)
+            np.copyto(inv_r, np.inf, where=near)
+            np.reciprocal(inv_r, out=inv_r)
+            
+            # f_mag / r_mag = 24 * (2 / r^14 - 1 / r^8)
+            np.power(inv_r, 6, out=work)
+            work *= 2
+            work -= 1
+            np.power(inv_r, 8, out=inv_r)
+            inv_r *= work
+            inv_r *= 24
+            
+            np.einsum('ij,ijk->ik', inv_r, r, out=forces[start:stop], dtype=np.float64)
+            
         return forces
         
     def update_system(self):
         """Velocity Verlet integrator for molecular dynamics"""
-        forces = self.calculate_forces()
+        scratch = self._get_scratch()
+        dt = self.time_step
+        inv_masses = 1.0 / self.masses[:, np.newaxis]
+        forces = self.calculate_forces(scratch['forces'])
         
-        # Update positions
-        self.positions += self.velocities * self.time_step + \
-                         0.5 * forces / self.masses[:, np.newaxis] * self.time_step**2
+        # Update positions (accumulated in float64)
+        step, delta = scratch['step'], scratch['delta']
+        np.multiply(forces, inv_masses, out=step)
+        step *= 0.5 * dt**2
+        np.multiply(self.velocities, dt, out=delta)
+        step += delta
+        step += self.positions
                          
         # Apply periodic boundary conditions
-        self.positions = self.positions % 1.0
+        np.mod(step, 1.0, out=step)
+        self.positions[...] = step
         
         # Calculate new forces
-        new_forces = self.calculate_forces()
+        new_forces = self.calculate_forces(scratch['new_forces'])
         
-        # Update velocities
-        self.velocities += 0.5 * (forces + new_forces) / self.masses[:, np.newaxis] * self.time_step
+        # Update velocities (accumulated in float64)
+        np.add(forces, new_forces, out=step)
+        step *= inv_masses
+        step *= 0.5 * dt
+        step += self.velocities
+        if self.dtype != np.float64:
+            # Saturate instead of overflowing to inf in reduced precision
+            limit = np.finfo(self.dtype).max
+            np.clip(step, -limit, limit, out=step)
+        self.velocities[...] = step
         
         # Apply Andersen thermostat
         collision_prob = 0.1
@@ -58,32 +152,252 @@ class JacksonHwangRNG:
         self.velocities[collisions] = np.random.normal(0, np.sqrt(self.temperature), 
                                                      (np.sum(collisions), 3))
         
-    def generate_numbers(self, n=6, min_num=1, max_num=45):
-        """Generate lotto numbers based on molecular simulation"""
-        # Run equilibration
-        for _ in range(self.equilibrium_steps):
+    def _run_steps(self, steps, deadline=None):
+        """Integrate up to `steps` steps, stopping once the deadline passes"""
+        for done in range(steps):
+            if deadline is not None and time.monotonic() >= deadline:
+                return done
             self.update_system()
+            self.total_steps += 1
+            if self.checkpoint_dir and self.total_steps % self.checkpoint_interval == 0:
+                self.save_checkpoint()
+        return steps
+        
+    def _checkpoint_dtype(self):
+        """Single-record layout holding the particle state and the RNG state"""
+        return np.dtype([
+            ('positions', np.float64, (self.num_particles, 3)),
+            ('velocities', np.float64, (self.num_particles, 3)),
+            ('masses', np.float64, (self.num_particles,)),
+            ('rng_key', np.uint32, (624,)),
+            ('rng_pos', np.int64),
+            ('rng_has_gauss', np.int64),
+            ('rng_cached_gaussian', np.float64),
+            ('total_steps', np.int64),
+            ('pid', np.int64)
+        ])
+        
+    def save_checkpoint(self):
+        """Write positions, velocities and RNG state to this process's checkpoint"""
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        _, key, pos, has_gauss, cached_gaussian = np.random.get_state()
+        record = np.zeros((), dtype=self._checkpoint_dtype())
+        record['positions'] = self.positions
+        record['velocities'] = self.velocities
+        record['masses'] = self.masses
+        record['rng_key'] = key
+        record['rng_pos'] = pos
+        record['rng_has_gauss'] = has_gauss
+        record['rng_cached_gaussian'] = cached_gaussian
+        record['total_steps'] = self.total_steps
+        record['pid'] = os.getpid()
+        
+        path = os.path.join(self.checkpoint_dir, f"md_state_{os.getpid()}.npy")
+        self._write_checkpoint(record, path)
+        return path
+        
+    @staticmethod
+    def _write_checkpoint(record, path):
+        """Write to a temp file and rename so readers never see a partial checkpoint"""
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.save(f, record)
+        os.replace(tmp_path, path)
+        
+    def resume_from_checkpoint(self):
+        """Resume from the newest compatible checkpoint in checkpoint_dir
+        
+        Ownership is read from the file name: checkpoints named after a live
+        process are never taken over. A dead writer's checkpoint is claimed
+        by renaming it to this process's name and immediately rewritten with
+        this pid and its RNG state dropped, so the same random stream is
+        restored at most once. Without a restorable RNG state (or with no
+        checkpoint) the RNG is reseeded so forked workers never share a stream.
+        """
+        if not self.checkpoint_dir:
+            return False
+            
+        own_pid = os.getpid()
+        own_path = os.path.join(self.checkpoint_dir, f"md_state_{own_pid}.npy")
+        candidates = sorted(glob.glob(os.path.join(self.checkpoint_dir, 'md_state_*.npy')),
+                            key=_mtime, reverse=True)
+        for path in candidates:
+            owner_pid = _checkpoint_pid(path)
+            if owner_pid is None or (owner_pid != own_pid and _pid_alive(owner_pid)):
+                continue
+            try:
+                record = np.load(path, mmap_mode='r')
+                if record.dtype != self._checkpoint_dtype():
+                    continue
+                if path != own_path:
+                    os.replace(path, own_path)
+                record = np.array(record)
+            except (OSError, ValueError):
+                # Unreadable, or already claimed by another worker
+                continue
+                
+            self.positions = np.array(record['positions'], dtype=self.dtype)
+            self.velocities = np.array(record['velocities'], dtype=self.dtype)
+            self.masses = np.array(record['masses'], dtype=self.dtype)
+            self.total_steps = int(record['total_steps'])
+            
+            # Only a checkpoint still holding its writer's own state carries a usable stream
+            if int(record['pid']) == owner_pid and int(record['rng_pos']) >= 0:
+                np.random.set_state(('MT19937', record['rng_key'], int(record['rng_pos']),
+                                     int(record['rng_has_gauss']), float(record['rng_cached_gaussian'])))
+            else:
+                np.random.seed()
+                
+            # Mark the claim on disk so a later resumer cannot replay this stream
+            record['pid'] = own_pid
+            record['rng_pos'] = -1
+            self._write_checkpoint(record, own_path)
+            self.resumed_from = path
+            return True
+            
+        np.random.seed()
+        return False
+        
+    def particle_energies(self):
+        """Kinetic energy per particle, accumulated in float64"""
+        return 0.5 * self.masses * np.einsum('ij,ij->i', self.velocities, self.velocities, dtype=np.float64)
+        
+    def kinetic_temperature(self):
+        """Instantaneous kinetic temperature (k_B = 1 units)"""
+        return 2 * np.sum(self.particle_energies()) / (3 * self.num_particles)
+        
+    def _equilibrate(self, deadline=None, on_check=None):
+        """Equilibrate until the kinetic temperature settles, the step budget or the deadline
+        
+        `on_check(steps_done)` is called after every completed check interval.
+        """
+        # Drift detector over a fixed ring of 2 * convergence_window observations
+        detector = EntropyDriftAnalyzer(window_size=self.convergence_window,
+                                        drift_threshold=self.convergence_tolerance,
+                                        convergence_rate=self.convergence_tolerance)
+        steps_done = 0
+        converged = False
+        while steps_done < self.equilibrium_steps:
+            chunk = min(self.convergence_check_interval, self.equilibrium_steps - steps_done)
+            done = self._run_steps(chunk, deadline)
+            steps_done += done
+            if done < chunk:
+                break
+            if on_check is not None:
+                on_check(steps_done)
+            if self.early_stopping and detector.update(self.kinetic_temperature())['is_stable']:
+                converged = True
+                break
+                
+        stats = self.equilibration_stats
+        stats['runs'] += 1
+        stats['converged_runs'] += int(converged)
+        stats['steps_used'] += steps_done
+        stats['steps_budgeted'] += self.equilibrium_steps
+        return steps_done, converged
+        
+    def _quality_tier(self, steps_done, converged):
+        """Classify how much equilibration was reached within the budget"""
+        if converged or steps_done >= self.equilibrium_steps:
+            return 'full'
+        if steps_done > 0:
+            return 'partial'
+        # No fresh integration: numbers come from the state pooled by earlier requests
+        return 'pooled'
+        
+    def _peak_rss_mb(self):
+        """Peak resident memory of this process, if psutil is available"""
+        if self.memory_monitor is None:
+            return None
+        return self.memory_monitor.get_peak_memory_usage()
+        
+    def generate_numbers(self, n=6, min_num=1, max_num=45, time_budget=None):
+        """Generate lotto numbers based on molecular simulation
+        
+        With a `time_budget` (seconds) the equilibration stops at the best
+        available state once the budget runs out; `last_run_info` reports
+        the quality tier reached ('full', 'partial' or 'pooled').
+        """
+        start = time.monotonic()
+        deadline = start + time_budget if time_budget is not None else None
+        
+        # Run equilibration
+        steps_done, converged = self._equilibrate(deadline)
+        self.last_run_info = {
+            'quality_tier': self._quality_tier(steps_done, converged),
+            'equilibration_steps': steps_done,
+            'converged': converged,
+            'elapsed_s': time.monotonic() - start,
+            'peak_rss_mb': self._peak_rss_mb()
+        }
             
         # Calculate particle energies
-        energies = 0.5 * self.masses * np.sum(self.velocities**2, axis=1)
+        energies = self.particle_energies()
         
         # Use particle energies to generate numbers
-        energy_ranks = np.argsort(energies)
+        return self._map_to_numbers(energies[np.newaxis], self.positions[np.newaxis],
+                                    n, min_num, max_num)[0]
+        
+    def generate_batch(self, k, n=6, min_num=1, max_num=45, time_budget=None):
+        """Generate k tickets from a single equilibrated trajectory"""
+        start = time.monotonic()
+        deadline = start + time_budget if time_budget is not None else None
+        
+        # Equilibrate once for the whole batch
+        steps_done, converged = self._equilibrate(deadline)
+        tier = self._quality_tier(steps_done, converged)
+            
+        # Sample snapshots at decorrelated intervals
+        energies = np.empty((k, self.num_particles))
+        positions = np.empty((k, self.num_particles, 3), dtype=self.dtype)
+        sample_steps = 0
+        for t in range(k):
+            if t > 0:
+                gap = self._run_steps(self.decorrelation_steps, deadline)
+                if gap == 0:
+                    # At least one step between samples so tickets never repeat
+                    self.update_system()
+                    gap = 1
+                if gap < self.decorrelation_steps and tier == 'full':
+                    tier = 'partial'
+                sample_steps += gap
+            energies[t] = self.particle_energies()
+            positions[t] = self.positions
+            
+        self.last_run_info = {
+            'quality_tier': tier,
+            'equilibration_steps': steps_done,
+            'converged': converged,
+            'decorrelation_steps': sample_steps,
+            'elapsed_s': time.monotonic() - start,
+            'peak_rss_mb': self._peak_rss_mb()
+        }
+        return self._map_to_numbers(energies, positions, n, min_num, max_num)
+        
+    @staticmethod
+    def _map_to_numbers(energies, positions, n, min_num, max_num):
+        """Map (k, N) energies and (k, N, 3) positions to k sorted tickets"""
+        # Particles at evenly spaced energy ranks, for all snapshots at once
+        energy_ranks = np.argsort(energies, axis=1)
+        rank_slots = np.arange(n) * energies.shape[1] // n
+        particle_idx = energy_ranks[:, rank_slots]
+        pos = np.take_along_axis(positions, particle_idx[:, :, np.newaxis], axis=1)
         
         # Convert to lotto numbers
-        lotto_numbers = []
-        for i in range(n):
-            particle_idx = energy_ranks[int(i * len(energy_ranks)/n)]
-            pos = self.positions[particle_idx]
-            number = int(min_num + (pos[0] * pos[1] * pos[2] * (max_num - min_num)))
-            
-            # Ensure number is within range and not duplicate
-            while number < min_num or number > max_num or number in lotto_numbers:
-                number = (number % (max_num - min_num + 1)) + min_num
-                
-            lotto_numbers.append(number)
+        raw_numbers = (min_num + np.prod(pos, axis=2) * (max_num - min_num)).astype(int)
+        
+        tickets = []
+        for row in raw_numbers:
+            lotto_numbers = []
+            for number in row.tolist():
+                # Ensure number is within range and not duplicate
+                while number < min_num or number > max_num or number in lotto_numbers:
+                    number = (number % (max_num - min_num + 1)) + min_num
+                    
+                lotto_numbers.append(number)
+            tickets.append(sorted(lotto_numbers))
             
-        return sorted(lotto_numbers)
+        return tickets
 
     def get_entropy(self):
         """Calculate the system's entropy"""
@@ -94,3 +408,245 @@ class JacksonHwangRNG:
         # Calculate entropy using Boltzmann's formula
         entropy = -np.sum(hist * np.log(hist + 1e-10))
         return entropy
+
+
+def _mtime(path):
+    """Modification time, or 0 for files removed while listing"""
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return 0
+
+
+def _checkpoint_pid(path):
+    """Pid of the process owning a checkpoint, taken from its file name"""
+    name = os.path.basename(path)[len('md_state_'):-len('.npy')]
+    return int(name) if name.isdigit() else None
+
+
+def _pid_alive(pid):
+    """Whether a process with this pid is still running"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _state_arrays(buffer, num_particles):
+    """Positions, velocities and masses views over one replica's shared block"""
+    n3 = num_particles * 3
+    positions = np.ndarray((num_particles, 3), dtype=np.float64, buffer=buffer)
+    velocities = np.ndarray((num_particles, 3), dtype=np.float64, buffer=buffer, offset=n3 * 8)
+    masses = np.ndarray((num_particles,), dtype=np.float64, buffer=buffer, offset=2 * n3 * 8)
+    return positions, velocities, masses
+
+
+def _replica_worker(shm_name, num_particles, equilibrium_steps, seed, lock, fresh, consumed, stop,
+                    progress, equilibrated):
+    """Replica process: equilibrate, then publish a decorrelated state per draw
+    
+    While equilibrating, the current state is published (not marked fresh)
+    at every check interval so draws under a deadline never come up empty.
+    """
+    np.random.seed(seed)
+    rng = JacksonHwangRNG(num_particles, equilibrium_steps)
+    shm = shared_memory.SharedMemory(name=shm_name)
+    positions, velocities, masses = _state_arrays(shm.buf, num_particles)
+    
+    def publish(steps_done, is_fresh):
+        with lock:
+            positions[:] = rng.positions
+            velocities[:] = rng.velocities
+            masses[:] = rng.masses
+            progress.value = steps_done
+            if is_fresh:
+                equilibrated.set()
+                fresh.set()
+                
+    try:
+        publish(0, False)
+        steps_done, _ = rng._equilibrate(on_check=lambda steps: publish(steps, False))
+        while not stop.is_set():
+            publish(steps_done, True)
+                
+            # Advance privately while the parent consumes the published state
+            rng._run_steps(rng.decorrelation_steps)
+            while not consumed.wait(0.1):
+                if stop.is_set():
+                    return
+            consumed.clear()
+    finally:
+        del positions, velocities, masses
+        shm.close()
+
+
+class JacksonHwangEnsemble:
+    """M independent JacksonHwangRNG replicas running in worker processes
+    
+    Each replica publishes its state into a shared memory block, so energies
+    are read in the parent without pickling arrays. Draws go round-robin
+    across replicas; a replica that is still advancing is skipped in favour
+    of the next one holding a fresh state. When no fresh state arrives
+    before the deadline, the latest published state is reused and tagged
+    'partial' (mid-equilibration) or 'pooled' (already handed out).
+    """
+    
+    def __init__(self, num_replicas=None, num_particles=None, equilibrium_steps=None):
+        self.num_replicas = num_replicas or CONFIG['replicas'] or mp.cpu_count()
+        self.num_particles = num_particles or CONFIG['num_particles']
+        self.equilibrium_steps = equilibrium_steps
+        self.replicas = []
+        self.cursor = 0
+        self.lock = threading.Lock()
+        
+        # Same reporting surface as JacksonHwangRNG
+        self.velocities = None
+        self.last_run_info = None
+        
+    def start(self, wait=False, timeout=None):
+        """Spawn the replica processes (optionally waiting for their first state)"""
+        with self.lock:
+            if not self.replicas:
+                self._spawn_replicas()
+                
+        if wait:
+            for replica in self.replicas:
+                replica['fresh'].wait(timeout)
+                
+    def _spawn_replicas(self):
+        """Create one shared memory block and worker process per replica"""
+        ctx = mp.get_context('spawn')
+        stop = ctx.Event()
+        seeds = np.random.SeedSequence().generate_state(self.num_replicas)
+        for seed in seeds:
+            shm = shared_memory.SharedMemory(create=True, size=7 * self.num_particles * 8)
+            
+            # Start from an unequilibrated state so draws never wait on process startup
+            positions, velocities, masses = _state_arrays(shm.buf, self.num_particles)
+            generator = np.random.default_rng(seed)
+            positions[:] = generator.random((self.num_particles, 3))
+            velocities[:] = generator.normal(0, np.sqrt(CONFIG['temperature']), (self.num_particles, 3))
+            masses[:] = 1.0
+            
+            replica = {
+                'shm': shm,
+                'arrays': (positions, velocities, masses),
+                'lock': ctx.Lock(),
+                'fresh': ctx.Event(),
+                'consumed': ctx.Event(),
+                'stop': stop,
+                'progress': ctx.Value('q', 0, lock=False),
+                'equilibrated': ctx.Event()
+            }
+            replica['process'] = ctx.Process(
+                target=_replica_worker,
+                args=(shm.name, self.num_particles, self.equilibrium_steps, int(seed),
+                      replica['lock'], replica['fresh'], replica['consumed'], stop,
+                      replica['progress'], replica['equilibrated']),
+                daemon=True
+            )
+            replica['process'].start()
+            self.replicas.append(replica)
+                
+    def close(self):
+        """Stop the replica processes and release the shared memory"""
+        if not self.replicas:
+            return
+            
+        self.replicas[0]['stop'].set()
+        for replica in self.replicas:
+            replica['consumed'].set()
+        for replica in self.replicas:
+            replica['process'].join(timeout=5)
+            if replica['process'].is_alive():
+                replica['process'].terminate()
+            del replica['arrays']
+            replica['shm'].close()
+            replica['shm'].unlink()
+        self.replicas = []
+        
+    def __enter__(self):
+        self.start()
+        return self
+        
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        
+    def _read(self, index, require_fresh):
+        """Copy one replica's energies and positions out of shared memory
+        
+        Returns the quality tier of the copied state with the snapshot, or
+        None when the replica has nothing (fresh) to hand out yet.
+        """
+        replica = self.replicas[index]
+        with replica['lock']:
+            if require_fresh and not replica['fresh'].is_set():
+                return None
+            if replica['progress'].value < 0:
+                return None
+            positions, velocities, masses = replica['arrays']
+            energies = 0.5 * masses * np.sum(velocities**2, axis=1)
+            snapshot = (energies, positions.copy(), velocities.copy())
+            if require_fresh:
+                tier = 'full'
+                replica['fresh'].clear()
+                replica['consumed'].set()
+            elif replica['equilibrated'].is_set() or replica['progress'].value == 0:
+                tier = 'pooled'
+            else:
+                tier = 'partial'
+        return tier, snapshot
+        
+    def _draw(self, deadline):
+        """Take the next fresh replica state in round-robin order"""
+        with self.lock:
+            first = self.cursor
+            self.cursor = (first + 1) % self.num_replicas
+        order = [(first + i) % self.num_replicas for i in range(self.num_replicas)]
+        
+        while True:
+            for index in order:
+                if self.replicas[index]['fresh'].is_set():
+                    result = self._read(index, require_fresh=True)
+                    if result is not None:
+                        return (index,) + result
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            if not any(replica['process'].is_alive() for replica in self.replicas):
+                break
+            self.replicas[first]['fresh'].wait(0.01)
+            
+        # Out of time: reuse the latest state a replica has published
+        for index in order:
+            result = self._read(index, require_fresh=False)
+            if result is not None:
+                return (index,) + result
+        raise TimeoutError("No replica state available within the time budget")
+        
+    def generate_numbers(self, n=6, min_num=1, max_num=45, time_budget=None):
+        """Generate lotto numbers from the next replica"""
+        return self.generate_batch(1, n, min_num, max_num, time_budget)[0]
+        
+    def generate_batch(self, k, n=6, min_num=1, max_num=45, time_budget=None):
+        """Generate k tickets, one replica state per ticket"""
+        self.start()
+        start = time.monotonic()
+        deadline = start + time_budget if time_budget is not None else None
+        
+        draws = [self._draw(deadline) for _ in range(k)]
+        energies = np.stack([snapshot[0] for _, _, snapshot in draws])
+        positions = np.stack([snapshot[1] for _, _, snapshot in draws])
+        self.velocities = draws[-1][2][2]
+        
+        tiers = {draw_tier for _, draw_tier, _ in draws}
+        tier = tiers.pop() if len(tiers) == 1 else 'partial'
+        self.last_run_info = {
+            'quality_tier': tier,
+            'replicas': [index for index, _, _ in draws],
+            'elapsed_s': time.monotonic() - start
+        }
+        return JacksonHwangRNG._map_to_numbers(energies, positions, n, min_num, max_num)
+
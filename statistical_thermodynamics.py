@@ -1,12 +1,96 @@
+import hashlib
+import threading
+from collections import OrderedDict
 import numpy as np
-from scipy import constants
+from scipy import constants, stats
+from entropy_analyzer import FixedEdgeHistogram
 
+def log_partition(energy_levels, temperature, k_B=constants.Boltzmann):
+    """Stable ln Z of one spectrum at one temperature (pure function)"""
+    x = -np.asarray(energy_levels, dtype=float) / (k_B * temperature)
+    x_max = np.max(x)
+    return x_max + np.log(np.sum(np.exp(x - x_max)))
+    
+def free_energy(energy_levels, temperature, k_B=constants.Boltzmann):
+    """Helmholtz free energy F = -k_B T ln Z (pure function, no shared state)"""
+    return -k_B * temperature * log_partition(energy_levels, temperature, k_B)
+    
+    
+class MaxwellBoltzmannValidator:
+    """Constant-memory binned comparison of streamed speeds against Maxwell-Boltzmann
+    
+    Speeds go into fixed bins on [0, v_max); anything faster lands in the
+    last bin, which is compared against the whole tail [edge, inf).
+    """
+    
+    def __init__(self, temperature, mass=1.0, k_B=constants.Boltzmann, bins=64, v_max=None):
+        self.temperature = temperature
+        self.mass = mass
+        self.k_B = k_B
+        self.scale = np.sqrt(k_B * temperature / mass)
+        v_max = v_max if v_max is not None else 5 * self.scale
+        self.histogram = FixedEdgeHistogram(bins, (0.0, v_max))
+        self.sum_v2 = 0.0
+        
+        # Theoretical bin probabilities from the Maxwell CDF (open-ended last bin)
+        cdf = stats.maxwell.cdf(self.histogram.edges[:-1], scale=self.scale)
+        self.expected = np.diff(np.append(cdf, 1.0))
+        
+    @property
+    def count(self):
+        return self.histogram.total
+        
+    def update(self, velocities):
+        """Accumulate a chunk of (n, 3) velocities or (n,) speeds"""
+        velocities = np.asarray(velocities, dtype=float)
+        speeds = np.linalg.norm(velocities, axis=1) if velocities.ndim > 1 else velocities
+        self.histogram.update(speeds)
+        self.sum_v2 += float(np.dot(speeds, speeds))
+        return self
+        
+    def merge(self, other):
+        """Combine with a validator built with the same parameters"""
+        self.histogram.merge(other.histogram)
+        self.sum_v2 += other.sum_v2
+        return self
+        
+    def result(self):
+        """Chi-square, KL divergence and fitted temperature of everything seen so far"""
+        n = self.count
+        if n == 0:
+            return None
+        observed = self.histogram.counts
+        expected = n * self.expected
+        
+        valid = expected > 0
+        chi_square = float(np.sum((observed[valid] - expected[valid])**2 / expected[valid]))
+        q = observed / n
+        seen = (q > 0) & valid
+        kl = float(np.sum(q[seen] * np.log(q[seen] / self.expected[seen])))
+        
+        return {
+            'samples': n,
+            'chi_square': chi_square,
+            'p_value': float(stats.chi2.sf(chi_square, max(int(valid.sum()) - 1, 1))),
+            'kl_divergence': kl,
+            # Equipartition: <v^2> = 3 k_B T / m
+            'fitted_temperature': self.mass * self.sum_v2 / n / (3 * self.k_B)
+        }
+        
+        
 class StatisticalThermodynamics:
-    def __init__(self, temperature=298.15):
+    def __init__(self, temperature=298.15, cache_size=128):
         self.temperature = temperature
         self.k_B = constants.Boltzmann
         self.h = constants.Planck
         
+        # Bounded free-energy memo keyed by (energy signature, temperature)
+        self.cache_size = cache_size
+        self._free_energy_cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        
     def maxwell_boltzmann_distribution(self, velocities):
         """Calculate Maxwell-Boltzmann distribution"""
         m = 1.0  # 단위 질량
@@ -19,17 +103,110 @@ class StatisticalThermodynamics:
                
         return prob
         
+    def validate_maxwell_boltzmann(self, velocity_chunks, mass=1.0, bins=64, v_max=None, k_B=None):
+        """Stream velocity chunks through a binned Maxwell-Boltzmann comparison
+        
+        `k_B` defaults to the SI constant; pass k_B=1.0 for velocities in
+        reduced units, such as those of JacksonHwangRNG.
+        """
+        k_B = self.k_B if k_B is None else k_B
+        validator = MaxwellBoltzmannValidator(self.temperature, mass, k_B, bins, v_max)
+        for chunk in velocity_chunks:
+            validator.update(chunk)
+        return validator.result()
+        
     def partition_function(self, energy_levels):
         """Calculate partition function"""
-        Z = np.sum(np.exp(-energy_levels/(self.k_B*self.temperature)))
+        Z = np.exp(self.log_partition_function(energy_levels))
         return Z
         
-    def free_energy(self, energy_levels):
-        """Calculate Helmholtz free energy"""
-        Z = self.partition_function(energy_levels)
-        F = -self.k_B * self.temperature * np.log(Z)
+    def log_partition_function(self, energies, temperatures=None):
+        """Stable ln Z via log-sum-exp
+        
+        `energies` is a (K,) spectrum or a (T, K) matrix (one spectrum per
+        temperature); `temperatures` is a scalar or a (T,) vector and defaults
+        to self.temperature. Returns a scalar or a (T,) array.
+        """
+        energies = np.asarray(energies, dtype=float)
+        T = self.temperature if temperatures is None else np.asarray(temperatures, dtype=float)
+        beta = 1.0 / (self.k_B * np.asarray(T, dtype=float))
+        
+        x = -energies * np.expand_dims(beta, -1)
+        x_max = np.max(x, axis=-1, keepdims=True)
+        log_Z = np.squeeze(x_max, -1) + np.log(np.sum(np.exp(x - x_max), axis=-1))
+        return log_Z
+        
+    def free_energy(self, energy_levels, temperature=None):
+        """Calculate Helmholtz free energy (memoized; never mutates self.temperature)"""
+        T = float(self.temperature if temperature is None else temperature)
+        energy_levels = np.ascontiguousarray(energy_levels, dtype=float)
+        key = (hashlib.blake2b(energy_levels.tobytes(), digest_size=16).digest(),
+               energy_levels.shape, T)
+        
+        with self._cache_lock:
+            F = self._free_energy_cache.get(key)
+            if F is not None:
+                self._free_energy_cache.move_to_end(key)
+                self.cache_hits += 1
+                return F
+            self.cache_misses += 1
+            
+        F = free_energy(energy_levels, T, self.k_B)
+        with self._cache_lock:
+            self._free_energy_cache[key] = F
+            if len(self._free_energy_cache) > self.cache_size:
+                self._free_energy_cache.popitem(last=False)
         return F
         
+    def get_cache_stats(self):
+        """Free-energy cache occupancy and hit/miss counters"""
+        with self._cache_lock:
+            return {
+                'size': len(self._free_energy_cache),
+                'max_size': self.cache_size,
+                'hits': self.cache_hits,
+                'misses': self.cache_misses
+            }
+        
+    def thermodynamic_sweep(self, energies, temperatures):
+        """F(T), U(T), S(T) and d2F/dT2 over a temperature grid in one pass
+        
+        `energies` is a (K,) spectrum shared by all temperatures or a (T, K)
+        matrix with one spectrum per grid point. The second derivative uses
+        the three-point stencil for (possibly non-uniform) grids and is NaN
+        at both ends.
+        """
+        T = np.asarray(temperatures, dtype=float)
+        energies = np.broadcast_to(np.asarray(energies, dtype=float), (len(T), np.shape(energies)[-1]))
+        beta = 1.0 / (self.k_B * T)
+        
+        # Boltzmann weights relative to the ground state of each row
+        x = -energies * beta[:, np.newaxis]
+        x_max = np.max(x, axis=1, keepdims=True)
+        weights = np.exp(x - x_max)
+        weight_sum = np.sum(weights, axis=1)
+        log_Z = x_max[:, 0] + np.log(weight_sum)
+        
+        F = -self.k_B * T * log_Z
+        U = np.sum(weights * energies, axis=1) / weight_sum
+        S = (U - F) / T
+        
+        d2F = np.full(len(T), np.nan)
+        if len(T) >= 3:
+            h_prev = T[1:-1] - T[:-2]
+            h_next = T[2:] - T[1:-1]
+            d2F[1:-1] = 2 * (h_prev * F[2:] - (h_prev + h_next) * F[1:-1] + h_next * F[:-2]) / \
+                        (h_prev * h_next * (h_prev + h_next))
+                        
+        return {
+            'temperature': T,
+            'log_partition': log_Z,
+            'free_energy': F,
+            'internal_energy': U,
+            'entropy': S,
+            'd2F_dT2': d2F
+        }
+        
     def entropy(self, energy_levels, probabilities):
         """Calculate entropy using Gibbs formula"""
         S = -self.k_B * np.sum(probabilities * np.log(probabilities + 1e-10))
@@ -37,40 +214,46 @@ class StatisticalThermodynamics:
         
     def optimize_numbers(self, candidates, num_select=6):
         """최적의 로또 번호 선택"""
-        # 숫자들의 에너지 레벨 계산 (간단한 모델)
-        energy_levels = np.array(candidates, dtype=float)
-        energy_levels = energy_levels / np.max(energy_levels)  # 정규화
+        selected = self.optimize_numbers_batch([candidates], self.temperature, num_select)[0]
+        return [candidates[i] for i in selected]
+        
+    def boltzmann_probabilities(self, candidates, temperatures=None, log=False):
+        """Boltzmann weights (or their logs) of each row of a (B, K) candidate matrix"""
+        # 숫자들의 에너지 레벨 계산 (간단한 모델, 행별 정규화)
+        energy_levels = np.atleast_2d(np.asarray(candidates, dtype=float))
+        energy_levels = energy_levels / np.max(energy_levels, axis=1, keepdims=True)
         
-        # Boltzmann 분포에 따른 확률 계산
-        probabilities = np.exp(-energy_levels/(self.k_B*self.temperature))
-        probabilities = probabilities / np.sum(probabilities)
+        T = self.temperature if temperatures is None else temperatures
+        T = np.broadcast_to(np.asarray(T, dtype=float), (len(energy_levels),))
+        log_Z = self.log_partition_function(energy_levels, T)
+        log_p = -energy_levels / (self.k_B * T[:, np.newaxis]) - log_Z[:, np.newaxis]
+        return log_p if log else np.exp(log_p)
         
-        # 자유 에너지 최소화 원리에 따른 선택
-        selected_indices = np.argsort(probabilities)[-num_select:]
-        selected_numbers = [candidates[i] for i in selected_indices]
+    def optimize_numbers_batch(self, candidates, temperatures=None, num_select=6):
+        """Top-k selection for B candidate rows at per-row temperatures
         
-        return sorted(selected_numbers)
+        Returns a (B, num_select) array of column indices into `candidates`,
+        ordered by candidate value within each row.
+        """
+        candidates = np.atleast_2d(np.asarray(candidates))
+        # 로그 확률로 비교해야 작은 k_B*T에서 언더플로로 동률이 생기지 않음
+        log_p = self.boltzmann_probabilities(candidates, temperatures, log=True)
+        num_select = min(num_select, candidates.shape[1])
+        
+        # 자유 에너지 최소화 원리에 따른 선택 (전체 정렬 없이 상위 k개)
+        top = np.argpartition(log_p, -num_select, axis=1)[:, -num_select:]
+        order = np.argsort(np.take_along_axis(candidates, top, axis=1), axis=1)
+        return np.take_along_axis(top, order, axis=1)
         
     def calculate_critical_points(self, energies, temperatures):
         """상전이 임계점 계산"""
-        critical_points = []
+        sweep = self.thermodynamic_sweep(energies, temperatures)
         
-        for i in range(1, len(temperatures)-1):
-            # 자유 에너지의 2차 미분 계산
-            F_prev = self.free_energy(energies[i-1])
-            F_curr = self.free_energy(energies[i])
-            F_next = self.free_energy(energies[i+1])
-            
-            second_derivative = (F_next - 2*F_curr + F_prev) / \
-                              ((temperatures[i+1] - temperatures[i-1])/2)**2
-                              
-            # 임계점 감지 (2차 미분이 0에 가까운 지점)
-            if abs(second_derivative) < 1e-6:
-                critical_points.append({
-                    'temperature': temperatures[i],
-                    'free_energy': F_curr,
-                    'entropy': self.entropy(energies[i], 
-                              np.exp(-energies[i]/(self.k_B*temperatures[i])))
-                })
-                
-        return critical_points
+        # 임계점 감지 (2차 미분이 0에 가까운 내부 격자점)
+        critical = np.flatnonzero(np.abs(sweep['d2F_dT2'][1:-1]) < 1e-6) + 1
+        
+        return [{
+            'temperature': float(sweep['temperature'][i]),
+            'free_energy': float(sweep['free_energy'][i]),
+            'entropy': float(sweep['entropy'][i])
+        } for i in critical]
@@ -1,8 +1,26 @@
+import base64
+import io
+import os
+import tempfile
+import time
+import threading
 import unittest
+import multiprocessing as mp
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
 import numpy as np
-from jackson_hwang_rng import JacksonHwangRNG
-from entropy_analyzer import EntropyDriftAnalyzer
-from statistical_thermodynamics import StatisticalThermodynamics
+from jackson_hwang_rng import JacksonHwangRNG, JacksonHwangEnsemble
+from entropy_analyzer import EntropyDriftAnalyzer, FixedEdgeHistogram
+from statistical_thermodynamics import StatisticalThermodynamics, MaxwellBoltzmannValidator, free_energy
+from utils.session_registry import SessionRegistry
+import image_quantum_analyzer
+from image_quantum_analyzer import ImageQuantumAnalyzer, FeatureCache
+from analyzers.data_analyzer import StreamingDataAnalyzer
+
+def _resume_and_draw(checkpoint_dir, queue):
+    rng = JacksonHwangRNG(num_particles=20, equilibrium_steps=0, checkpoint_dir=checkpoint_dir)
+    queue.put((rng.resumed_from, np.random.random()))
+
 
 class TestLottoScientific(unittest.TestCase):
     def setUp(self):
@@ -17,6 +35,159 @@ class TestLottoScientific(unittest.TestCase):
         self.assertTrue(all(1 <= n <= 45 for n in numbers))
         self.assertEqual(len(set(numbers)), 6)  # Check for duplicates
         
+    def _small_rng(self, num_particles=40, steps=5):
+        """Shrink the RNG so trajectory tests finish quickly"""
+        rng = self.rng
+        rng.num_particles = num_particles
+        rng.positions = np.random.rand(num_particles, 3)
+        rng.velocities = np.random.normal(0, np.sqrt(rng.temperature), (num_particles, 3))
+        rng.masses = np.ones(num_particles)
+        rng.equilibrium_steps = steps
+        rng.decorrelation_steps = 2
+        return rng
+        
+    def test_generate_batch(self):
+        """Test multi-ticket generation from one trajectory"""
+        tickets = self._small_rng().generate_batch(5, 6, 1, 45)
+        self.assertEqual(len(tickets), 5)
+        for numbers in tickets:
+            self.assertEqual(len(set(numbers)), 6)
+            self.assertTrue(all(1 <= n <= 45 for n in numbers))
+            self.assertEqual(numbers, sorted(numbers))
+        
+    def test_time_budget_quality_tier(self):
+        """Test deadline-aware generation reports the tier reached"""
+        rng = self._small_rng()
+        numbers = rng.generate_numbers(time_budget=0)
+        self.assertEqual(len(set(numbers)), 6)
+        self.assertEqual(rng.last_run_info['quality_tier'], 'pooled')
+        self.assertEqual(rng.last_run_info['equilibration_steps'], 0)
+        
+        rng.generate_numbers(time_budget=60)
+        self.assertEqual(rng.last_run_info['quality_tier'], 'full')
+        
+    def test_equilibration_early_stop(self):
+        """Test equilibration stops once the kinetic temperature settles"""
+        rng = self._small_rng(steps=10000)
+        rng.update_system = lambda: None  # frozen system: observable never drifts
+        rng.generate_numbers()
+        
+        info = rng.last_run_info
+        self.assertTrue(info['converged'])
+        self.assertEqual(info['quality_tier'], 'full')
+        self.assertEqual(info['equilibration_steps'],
+                         2 * rng.convergence_window * rng.convergence_check_interval)
+        self.assertEqual(rng.equilibration_stats['steps_budgeted'], 10000)
+        
+    def test_replica_ensemble(self):
+        """Test round-robin draws across replica processes"""
+        with JacksonHwangEnsemble(2, num_particles=20, equilibrium_steps=5) as ensemble:
+            tickets = ensemble.generate_batch(4)
+            self.assertEqual(set(ensemble.last_run_info['replicas']), {0, 1})
+            self.assertEqual(ensemble.last_run_info['quality_tier'], 'full')
+            for numbers in tickets:
+                self.assertEqual(len(set(numbers)), 6)
+                self.assertTrue(all(1 <= n <= 45 for n in numbers))
+                
+            ensemble.generate_numbers(time_budget=0)
+            self.assertEqual(ensemble.last_run_info['quality_tier'], 'pooled')
+        
+    def test_replica_ensemble_cold_start(self):
+        """Test draws fall back to unfinished replica states instead of timing out"""
+        with JacksonHwangEnsemble(2, num_particles=300, equilibrium_steps=100000) as ensemble:
+            numbers = ensemble.generate_numbers(time_budget=0)
+            self.assertEqual(len(set(numbers)), 6)
+            self.assertEqual(ensemble.last_run_info['quality_tier'], 'pooled')
+            
+            tiers = set()
+            for _ in range(30):
+                ensemble.generate_numbers(time_budget=0.5)
+                tiers.add(ensemble.last_run_info['quality_tier'])
+                if 'partial' in tiers:
+                    break
+            self.assertIn('partial', tiers)
+            self.assertNotIn('full', tiers)
+        
+    def test_checkpoint_warm_start(self):
+        """Test a new RNG resumes from the latest checkpoint"""
+        with tempfile.TemporaryDirectory() as checkpoint_dir:
+            rng = JacksonHwangRNG(num_particles=20, equilibrium_steps=0,
+                                  checkpoint_dir=checkpoint_dir)
+            self.assertIsNone(rng.resumed_from)
+            rng.checkpoint_interval = 2
+            rng._run_steps(2)
+            self.assertEqual(len(os.listdir(checkpoint_dir)), 1)
+            
+            resumed = JacksonHwangRNG(num_particles=20, equilibrium_steps=0,
+                                      checkpoint_dir=checkpoint_dir)
+            self.assertIsNotNone(resumed.resumed_from)
+            self.assertEqual(resumed.total_steps, 2)
+            np.testing.assert_array_equal(resumed.positions, rng.positions)
+            np.testing.assert_array_equal(resumed.velocities, rng.velocities)
+        
+    def test_checkpoint_concurrent_resumers(self):
+        """Test a claimed checkpoint is never resumed again by a live worker"""
+        with tempfile.TemporaryDirectory() as checkpoint_dir:
+            writer = JacksonHwangRNG(num_particles=20, equilibrium_steps=0,
+                                     checkpoint_dir=checkpoint_dir, resume=False)
+            record = np.load(writer.save_checkpoint())
+            
+            # Leave the checkpoint as if its writer had exited
+            dead = mp.get_context('fork').Process(target=os.getpid)
+            dead.start()
+            dead.join()
+            record['pid'] = dead.pid
+            for path in os.listdir(checkpoint_dir):
+                os.remove(os.path.join(checkpoint_dir, path))
+            np.save(os.path.join(checkpoint_dir, f"md_state_{dead.pid}.npy"), record)
+            
+            first = JacksonHwangRNG(num_particles=20, equilibrium_steps=0,
+                                    checkpoint_dir=checkpoint_dir)
+            self.assertIsNotNone(first.resumed_from)
+            claimed = np.load(os.path.join(checkpoint_dir, f"md_state_{os.getpid()}.npy"))
+            self.assertEqual(int(claimed['pid']), os.getpid())
+            self.assertEqual(int(claimed['rng_pos']), -1)
+            first_draw = np.random.random()
+            
+            # A second live worker must not take over the first one's state or stream
+            queue = mp.get_context('fork').Queue()
+            second = mp.get_context('fork').Process(target=_resume_and_draw,
+                                                    args=(checkpoint_dir, queue))
+            second.start()
+            resumed_from, draw = queue.get(timeout=30)
+            second.join()
+            self.assertIsNone(resumed_from)
+            self.assertNotEqual(draw, first_draw)
+            self.assertEqual(os.listdir(checkpoint_dir), [f"md_state_{os.getpid()}.npy"])
+            
+    def test_chunked_forces_match_pairwise(self):
+        """Test the chunked force path against the pairwise formula"""
+        rng = JacksonHwangRNG(num_particles=12)
+        rng.force_chunk_size = 5
+        expected = np.zeros((12, 3))
+        for i in range(12):
+            for j in range(i + 1, 12):
+                r = rng.positions[j] - rng.positions[i]
+                r_mag = np.linalg.norm(r)
+                f = 24 * (2 * (1/r_mag)**13 - (1/r_mag)**7) * r / r_mag
+                expected[i] += f
+                expected[j] -= f
+        np.testing.assert_allclose(rng.calculate_forces(), expected, rtol=1e-9)
+        
+    def test_float32_mode(self):
+        """Test single-precision arrays stay finite and reuse scratch buffers"""
+        rng = JacksonHwangRNG(num_particles=30, equilibrium_steps=5, dtype='float32')
+        numbers = rng.generate_numbers()
+        scratch = rng._get_scratch()
+        rng.update_system()
+        
+        self.assertIs(rng._get_scratch(), scratch)
+        self.assertEqual(rng.positions.dtype, np.float32)
+        self.assertEqual(rng.velocities.dtype, np.float32)
+        self.assertTrue(np.isfinite(rng.velocities).all())
+        self.assertEqual(len(set(numbers)), 6)
+        self.assertGreater(rng.last_run_info['peak_rss_mb'], 0)
+        
     def test_entropy_analysis(self):
         """Test entropy drift analysis"""
         # Generate some test data
@@ -29,6 +200,452 @@ class TestLottoScientific(unittest.TestCase):
         self.assertIn('convergence', analysis)
         self.assertIn('is_stable', analysis)
         
+    def test_drift_ring_buffer(self):
+        """Test windowed drift statistics with bounded history"""
+        analyzer = EntropyDriftAnalyzer(window_size=4)
+        values = np.random.uniform(4, 5, 25)
+        for value in values:
+            result = analyzer.update(value)
+            
+        ma = np.mean(values[-4:])
+        prev_ma = np.mean(values[-8:-4])
+        self.assertEqual(analyzer.total_samples, 25)
+        self.assertEqual(analyzer.entropy_history, list(values[-8:]))
+        self.assertAlmostEqual(result['drift'], (values[-1] - ma) / ma)
+        self.assertAlmostEqual(result['convergence'], abs(ma - prev_ma) / prev_ma)
+        
+    def test_drift_batch(self):
+        """Test batched drift analysis against the streaming path"""
+        analyzer = EntropyDriftAnalyzer(window_size=3)
+        samples = np.random.randn(12, 50, 3)
+        result = analyzer.analyze_drift_batch(samples, bins=16)
+        
+        streaming = EntropyDriftAnalyzer(window_size=3)
+        for t, sample in enumerate(samples):
+            hist, _ = np.histogram(np.linalg.norm(sample, axis=1),
+                                   bins=result['bin_edges'], density=True)
+            entropy = -np.sum(hist * np.log2(hist + 1e-10))
+            expected = streaming.update(entropy)
+            self.assertAlmostEqual(result['entropy'][t], entropy)
+            self.assertAlmostEqual(result['drift'][t], expected['drift'])
+            self.assertEqual(result['is_stable'][t], expected['is_stable'])
+        self.assertTrue(np.all(np.isinf(result['convergence'][:5])))
+        self.assertEqual(analyzer.total_samples, 0)
+        
+    def test_fixed_edge_histogram(self):
+        """Test fixed-edge entropy and mergeable streaming counts"""
+        values = np.random.uniform(0, 1, 1000)
+        hist = FixedEdgeHistogram(bins=20, value_range=(0, 1))
+        expected, _ = np.histogram(values, bins=hist.edges)
+        np.testing.assert_array_equal(hist.histogram(values), expected)
+        
+        first = FixedEdgeHistogram(bins=20, value_range=(0, 1)).update(values[:400])
+        second = FixedEdgeHistogram(bins=20, value_range=(0, 1)).update(values[400:])
+        first.merge(second)
+        self.assertEqual(first.total, 1000)
+        self.assertAlmostEqual(first.entropy(), hist.entropy(values))
+        with self.assertRaises(ValueError):
+            first.merge(FixedEdgeHistogram(bins=10, value_range=(0, 1)))
+            
+        analyzer = EntropyDriftAnalyzer(value_range=(0, 1))
+        self.assertAlmostEqual(analyzer.calculate_entropy(values),
+                               analyzer.histogram.entropy(values))
+        
+    def test_distribution_bias(self):
+        """Test pooled and per-ticket distribution bias"""
+        analyzer = EntropyDriftAnalyzer()
+        self.assertAlmostEqual(analyzer.get_distribution_bias(np.arange(1, 46)), 0.0)
+        self.assertAlmostEqual(analyzer.get_distribution_bias([7, 7, 7]), 1.0)
+        
+        tickets = np.array([[1, 2, 3, 4, 5, 6], [5, 5, 5, 5, 5, 5]])
+        bias = analyzer.get_distribution_bias(tickets, per_row=True)
+        self.assertEqual(bias.shape, (2,))
+        self.assertAlmostEqual(bias[0], 1 - np.log2(6) / np.log2(45))
+        self.assertAlmostEqual(bias[1], 1.0)
+        
+        # Out-of-range values must not spill into the next ticket's bins
+        for bad in ([[1, 2, 3, 4, 5, 46], [1, 2, 3, 4, 5, 6]], [[0, 1, 2, 3, 4, 5]]):
+            with self.assertRaises(ValueError):
+                analyzer.get_distribution_bias(bad, per_row=True)
+            with self.assertRaises(ValueError):
+                analyzer.get_distribution_bias(bad)
+        
+    def test_log_partition_sweep(self):
+        """Test stable log-partition and vectorized temperature sweep"""
+        k_B = self.thermo.k_B
+        temperatures = np.linspace(1, 3, 5) / k_B
+        energies = np.random.uniform(0, 2, (5, 8))
+        sweep = self.thermo.thermodynamic_sweep(energies, temperatures)
+        
+        for i, T in enumerate(temperatures):
+            weights = np.exp(-energies[i] / (k_B * T))
+            p = weights / weights.sum()
+            self.assertAlmostEqual(sweep['free_energy'][i] / (k_B * T), -np.log(weights.sum()))
+            self.assertAlmostEqual(sweep['entropy'][i] / k_B, -np.sum(p * np.log(p)))
+        self.assertTrue(np.isnan(sweep['d2F_dT2'][[0, -1]]).all())
+        
+        # Room-temperature k_B*T: the naive sum underflows, ln Z does not
+        log_Z = self.thermo.log_partition_function(np.array([1.0, 2.0, 3.0]))
+        self.assertTrue(np.isfinite(log_Z))
+        self.assertTrue(np.isfinite(self.thermo.free_energy(np.array([1.0, 2.0, 3.0]))))
+        
+    def test_optimize_numbers_batch(self):
+        """Test batched top-k thermodynamic selection"""
+        candidates = np.array([np.random.permutation(np.arange(1, 47)) for _ in range(4)])
+        temperatures = np.array([298.15, 1e20, 1e22, 1e24])
+        selected = self.thermo.optimize_numbers_batch(candidates, temperatures)
+        self.assertEqual(selected.shape, (4, 6))
+        
+        log_p = self.thermo.boltzmann_probabilities(candidates, temperatures, log=True)
+        for row in range(4):
+            expected = np.sort(candidates[row][np.argsort(log_p[row])[-6:]])
+            np.testing.assert_array_equal(candidates[row][selected[row]], expected)
+            
+        self.assertEqual(self.thermo.optimize_numbers([9, 3, 7, 1, 2, 8, 6, 5]), [1, 2, 3, 5, 6, 7])
+        
+    def test_free_energy_cache(self):
+        """Test memoized free energy without mutating the temperature"""
+        thermo = StatisticalThermodynamics(cache_size=2)
+        energies = np.arange(1, 47, dtype=float)
+        
+        F = thermo.free_energy(energies, 500.0)
+        self.assertEqual(thermo.free_energy(energies, 500.0), F)
+        self.assertAlmostEqual(F, free_energy(energies, 500.0))
+        self.assertEqual(thermo.temperature, 298.15)
+        self.assertNotEqual(thermo.free_energy(energies), F)
+        thermo.free_energy(energies * 2, 500.0)
+        
+        stats = thermo.get_cache_stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['size']), (1, 3, 2))
+        
+    def test_maxwell_boltzmann_stream(self):
+        """Test chunked Maxwell-Boltzmann validation"""
+        thermo = StatisticalThermodynamics(temperature=300)
+        sigma = np.sqrt(thermo.k_B * 300)
+        rng = np.random.default_rng(0)
+        chunks = [rng.normal(0, sigma, (5000, 3)) for _ in range(4)]
+        
+        result = thermo.validate_maxwell_boltzmann(iter(chunks))
+        self.assertEqual(result['samples'], 20000)
+        self.assertLess(result['kl_divergence'], 0.01)
+        self.assertAlmostEqual(result['fitted_temperature'] / 300, 1, places=1)
+        
+        # Merged partial validators equal a single pass
+        first = MaxwellBoltzmannValidator(300).update(chunks[0]).update(chunks[1])
+        second = MaxwellBoltzmannValidator(300).update(chunks[2]).update(chunks[3])
+        self.assertAlmostEqual(first.merge(second).result()['chi_square'], result['chi_square'])
+        
+        hot = thermo.validate_maxwell_boltzmann(iter([c * 2 for c in chunks]))
+        self.assertGreater(hot['kl_divergence'], 0.5)
+        
+        # MD velocities are in k_B = 1 units
+        md = JacksonHwangRNG(num_particles=1000, equilibrium_steps=0)
+        md_thermo = StatisticalThermodynamics(temperature=md.temperature)
+        md_chunks = np.array_split(md.velocities, 4)
+        reduced = md_thermo.validate_maxwell_boltzmann(iter(md_chunks), k_B=1.0)
+        self.assertEqual(reduced['samples'], 1000)
+        self.assertLess(reduced['kl_divergence'], 0.08)
+        self.assertAlmostEqual(reduced['fitted_temperature'] / md.temperature, 1, delta=0.1)
+        self.assertGreater(md_thermo.validate_maxwell_boltzmann(iter(md_chunks))['kl_divergence'], 1)
+        
+    def test_quantum_entropy_matrix_free(self):
+        """Test closed-form and reduced-density-matrix quantum entropies"""
+        analyzer = ImageQuantumAnalyzer()
+        state = analyzer._image_to_quantum_state(np.random.rand(8, 8, 3))
+        
+        # Reference: eigenvalues of the explicit density matrix
+        rho = np.outer(state.flatten(), state.flatten())
+        eigenvalues = np.real(np.linalg.eigvals(rho))
+        eigenvalues = eigenvalues[eigenvalues > 0]
+        expected = -np.sum(eigenvalues * np.log2(eigenvalues))
+        self.assertAlmostEqual(analyzer._calculate_quantum_entropy(state), expected, places=9)
+        
+        # Reduced density matrix of a rank-3 state: exact SVD == eigenvalues of M M^T
+        matrix = np.random.rand(30, 3) @ np.random.rand(3, 40)
+        matrix /= np.linalg.norm(matrix)
+        eigenvalues = np.linalg.eigvalsh(matrix @ matrix.T)
+        eigenvalues = eigenvalues[eigenvalues > 1e-15]
+        self.assertAlmostEqual(analyzer._calculate_entanglement_entropy(matrix),
+                               -np.sum(eigenvalues * np.log2(eigenvalues)), places=6)
+        
+    def test_image_pyramid(self):
+        """Test area-averaged downsampling and tiled extraction"""
+        analyzer = ImageQuantumAnalyzer()
+        image = np.random.randint(0, 256, (600, 1000, 3), dtype=np.uint8)
+        levels = analyzer.build_pyramid(image, max_side=256)
+        self.assertEqual([level.shape[:2] for level in levels],
+                         [(600, 1000), (300, 500), (150, 250)])
+        self.assertEqual(levels[-1].dtype, np.uint8)
+        
+        block = image[:2, :2].astype(float).mean(axis=(0, 1))
+        np.testing.assert_allclose(levels[1][0, 0], block, atol=0.5)
+        np.testing.assert_array_equal(analyzer.downsample(image, 256), levels[-1])
+        
+        tiles = analyzer.extract_tiled_features(image[:300, :400], tile_size=200)
+        self.assertEqual([(t['row'], t['col']) for t in tiles],
+                         [(0, 0), (0, 200), (200, 0), (200, 200)])
+        
+    def test_decode_image_from_memory(self):
+        """Test decoding uploads from bytes, base64 and file objects"""
+        from PIL import Image
+        image = np.random.randint(0, 256, (120, 160, 3), dtype=np.uint8)
+        buffer = io.BytesIO()
+        Image.fromarray(image).save(buffer, format='PNG')
+        data = buffer.getvalue()
+        
+        analyzer = ImageQuantumAnalyzer()
+        raw = analyzer.decode_image(data, max_side=256, normalize=False)
+        self.assertEqual(raw.dtype, np.uint8)
+        np.testing.assert_array_equal(raw, image)
+        
+        encoded = 'data:image/png;base64,' + base64.b64encode(data).decode()
+        for source in (encoded, io.BytesIO(data)):
+            decoded = analyzer.decode_image(source, max_side=100)
+            self.assertEqual(decoded.shape, (60, 80, 3))
+            self.assertLessEqual(decoded.max(), 1.0)
+            
+        # load_image takes plain base64 (no data: prefix) the same way
+        loaded = analyzer.load_image(base64.b64encode(data).decode(), max_side=256)
+        np.testing.assert_allclose(loaded, image / 255.0)
+        
+        with self.assertRaises(ValueError):
+            analyzer.decode_image(b'not an image')
+            
+    def test_feature_cache(self):
+        """Test content-addressed feature cache with disk tier"""
+        from PIL import Image
+        buffer = io.BytesIO()
+        Image.fromarray(np.random.randint(0, 256, (64, 80, 3), dtype=np.uint8)).save(buffer, format='PNG')
+        data = buffer.getvalue()
+        
+        with tempfile.TemporaryDirectory() as cache_dir:
+            analyzer = ImageQuantumAnalyzer(FeatureCache(max_entries=8, disk_dir=cache_dir))
+            features = analyzer.analyze_upload(data)
+            self.assertIs(analyzer.analyze_upload(data), features)
+            self.assertLessEqual(max(features['interference'].shape[:2]), 32)
+            
+            # One upload is one cache entry and one file
+            self.assertEqual(analyzer.feature_cache.get_stats()['size'], 1)
+            self.assertEqual(len(os.listdir(cache_dir)), 1)
+            
+            # A fresh process-level cache is served from disk
+            restored = ImageQuantumAnalyzer(FeatureCache(disk_dir=cache_dir)).analyze_upload(data)
+            self.assertAlmostEqual(restored['entanglement_entropy'], features['entanglement_entropy'])
+            np.testing.assert_allclose(restored['interference_profile'], features['interference_profile'])
+            self.assertIsInstance(restored['channel_entropies'], list)
+            self.assertEqual(restored['channel_entropies'], features['channel_entropies'])
+            
+        # The disk tier keeps only the most recently used files
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = FeatureCache(max_entries=1, disk_dir=cache_dir, max_disk_entries=2)
+            for key in 'abc':
+                cache.put(key, {'value': 1.0, 'channels': [1.0, 2.0]})
+                time.sleep(0.01)
+            self.assertEqual(sorted(os.listdir(cache_dir)), ['b.npz', 'c.npz'])
+            self.assertEqual(cache.get('b'), {'value': 1.0, 'channels': [1.0, 2.0]})
+            time.sleep(0.01)
+            cache.put('d', {'value': 2.0})
+            self.assertEqual(sorted(os.listdir(cache_dir)), ['b.npz', 'd.npz'])
+            self.assertEqual(cache.get_stats()['disk_evictions'], 2)
+            
+        # Disk failures fall back to the memory tier
+        with tempfile.TemporaryDirectory() as parent:
+            cache_dir = os.path.join(parent, 'cache')
+            cache = FeatureCache(disk_dir=cache_dir)
+            os.rmdir(cache_dir)
+            cache.put('a', {'value': 1.0})
+            self.assertEqual(cache.get('a'), {'value': 1.0})
+            self.assertEqual(cache.get_stats()['disk_errors'], 1)
+            self.assertEqual(os.listdir(parent), [])
+            
+            blocked = os.path.join(parent, 'file')
+            open(blocked, 'w').close()
+            cache = FeatureCache(disk_dir=os.path.join(blocked, 'cache'))
+            self.assertIsNone(cache.disk_dir)
+            self.assertEqual(cache.get_stats()['disk_errors'], 1)
+            
+        cache = FeatureCache(max_entries=2)
+        for key in 'abc':
+            cache.put(key, {'value': 1.0})
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.get_stats()['size'], 2)
+        
+    def test_feature_history_policy(self):
+        """Test bounded feature history retention"""
+        images = [np.random.rand(16, 16, 3) for _ in range(5)]
+        
+        last_k = ImageQuantumAnalyzer(FeatureCache(), history_policy='last_k', history_size=2)
+        features = [last_k.extract_quantum_features(image) for image in images]
+        self.assertEqual(len(last_k.quantum_states), 2)
+        self.assertEqual(len(last_k.wave_functions), 2)
+        
+        summary = ImageQuantumAnalyzer(FeatureCache(), history_policy='summary', history_size=3)
+        for image in images:
+            summary.extract_quantum_features(image)
+        history = summary.get_history_summary()
+        self.assertEqual(len(summary.quantum_states), 0)
+        self.assertEqual(history['count'], 5)
+        np.testing.assert_allclose(history['coherence'], [f['coherence'] for f in features[-3:]])
+        
+        none = ImageQuantumAnalyzer(FeatureCache(), history_policy='none')
+        none.extract_quantum_features(images[0])
+        self.assertEqual(none.get_history_summary()['count'], 0)
+        
+    def test_quantum_features_fft_backend(self):
+        """Test scipy.fft path and closed forms against the original transforms"""
+        from scipy.fftpack import dct
+        analyzer = ImageQuantumAnalyzer(FeatureCache(), history_policy='last_k')
+        image = np.random.rand(24, 18, 3)
+        
+        dct_image = dct(dct(image.T, norm='ortho').T, norm='ortho')
+        state = np.abs(dct_image) / np.sqrt(np.sum(np.abs(dct_image)**2))
+        psi = np.fft.fft2(state)
+        psi = psi / np.sqrt(np.sum(np.abs(psi)**2))
+        pattern = np.abs(np.fft.fftshift(np.fft.fft2(psi)))**2
+        
+        quantum_state = analyzer._image_to_quantum_state(image)
+        np.testing.assert_allclose(quantum_state, state)
+        np.testing.assert_allclose(analyzer._calculate_wave_function(quantum_state), psi, atol=1e-12)
+        np.testing.assert_allclose(analyzer._interference_from_state(quantum_state), pattern, atol=1e-12)
+        self.assertAlmostEqual(analyzer._coherence_from_state(quantum_state), np.abs(np.mean(psi)))
+        
+        features = analyzer.extract_quantum_features(image)
+        np.testing.assert_allclose(features['interference_profile'], pattern.mean(axis=(0, 1)))
+        self.assertEqual(len(analyzer.wave_functions), 1)
+        
+    def test_extract_batch(self):
+        """Test streamed batch feature extraction in a process pool"""
+        from PIL import Image
+        buffers = []
+        for _ in range(3):
+            buffer = io.BytesIO()
+            Image.fromarray(np.random.randint(0, 256, (40, 50, 3), dtype=np.uint8)).save(buffer, format='PNG')
+            buffers.append(buffer.getvalue())
+            
+        analyzer = ImageQuantumAnalyzer(FeatureCache())
+        serial = {r['index']: r for r in analyzer.extract_batch(buffers + [b'bad'], workers=1)}
+        parallel = {r['index']: r for r in analyzer.extract_batch(buffers, workers=2)}
+        
+        self.assertIn('error', serial[3])
+        self.assertEqual(analyzer.feature_cache.get_stats()['size'], 3)
+        self.assertEqual(sorted(parallel), [0, 1, 2])
+        for index in parallel:
+            self.assertAlmostEqual(parallel[index]['features']['entanglement_entropy'],
+                                   serial[index]['features']['entanglement_entropy'])
+            
+        # A blocked first item must not hold back the ones queued behind it
+        release = threading.Event()
+        
+        def blocking_worker(index, source, max_side):
+            if index == 0:
+                release.wait(10)
+            return {'index': index}
+            
+        order = []
+        with mock.patch.object(image_quantum_analyzer, '_extract_worker', blocking_worker), \
+                mock.patch.object(image_quantum_analyzer, 'ProcessPoolExecutor',
+                                  lambda max_workers, mp_context: ThreadPoolExecutor(max_workers)):
+            for result in analyzer.extract_batch(range(6), workers=2):
+                order.append(result['index'])
+                if len(order) == 5:
+                    release.set()
+        self.assertTrue(release.is_set())
+        self.assertEqual(sorted(order[:5]), [1, 2, 3, 4, 5])
+        self.assertEqual(order[-1], 0)
+            
+    def test_uint8_channel_entropy(self):
+        """Test single-pass uint8 channel entropy against the float path"""
+        analyzer = ImageQuantumAnalyzer(FeatureCache())
+        image = np.random.randint(0, 256, (64, 48, 3), dtype=np.uint8)
+        image[0, 0] = 255
+        
+        fast = analyzer._analyze_image_entropy(image)
+        expected = []
+        for channel in range(3):
+            hist, _ = np.histogram(image[:, :, channel] / 255.0, bins=256, range=(0, 1))
+            hist = hist / hist.sum()
+            expected.append(-np.sum(hist * np.log2(hist + 1e-7)))
+        np.testing.assert_allclose(fast['channel_entropies'], expected)
+        self.assertAlmostEqual(fast['total_entropy'], np.mean(expected))
+        
+        # The float path remains as a fallback (including float64 input)
+        slow = analyzer._analyze_image_entropy(image / 255.0)
+        np.testing.assert_allclose(slow['channel_entropies'], expected)
+        
+    def test_image_ticket_sampling(self):
+        """Test local-Generator ticket sampling from image features"""
+        analyzer = ImageQuantumAnalyzer(FeatureCache())
+        features = analyzer.extract_quantum_features(np.random.rand(32, 32, 3))
+        
+        state = np.random.get_state()[1].copy()
+        ticket = analyzer.generate_numbers(features)
+        np.testing.assert_array_equal(np.random.get_state()[1], state)
+        self.assertEqual(ticket, analyzer.generate_numbers(features))
+        self.assertEqual(len(set(ticket)), 6)
+        self.assertTrue(all(1 <= n <= 45 for n in ticket))
+        
+        tickets = np.array(analyzer.generate_batch(features, 500, max_num=46))
+        self.assertEqual(tickets.shape, (500, 6))
+        self.assertTrue(np.all(np.diff(tickets, axis=1) > 0))
+        
+        # Gumbel top-k marginals match sequential sampling without replacement
+        probs = np.random.dirichlet(np.ones(8))
+        custom = {'interference_profile': probs, 'coherence': 1.0, 'entropy': 0.5, 'interference': probs}
+        draws = np.array(analyzer.generate_batch(custom, 20000, n=3, max_num=8))
+        rng = np.random.default_rng(0)
+        expected = np.array([rng.choice(8, 3, replace=False, p=probs) for _ in range(20000)]) + 1
+        np.testing.assert_allclose(np.bincount(draws.ravel(), minlength=9) / 20000,
+                                   np.bincount(expected.ravel(), minlength=9) / 20000, atol=0.03)
+        
+    def test_streaming_data_analyzer(self):
+        """Test fixed-size accumulators in the streaming data analyzer"""
+        results = [[1, 2, 3, 10, 11, 46], [5, 6, 7, 8, 9, 12], [2, 14, 23, 31, 40, 41]]
+        single = StreamingDataAnalyzer()
+        for result in results:
+            single.add_result(result)
+        batch = StreamingDataAnalyzer()
+        batch.add_results_batch(results)
+        
+        patterns = single.get_pattern_analysis()
+        self.assertEqual(patterns['consecutive_pairs'], 3 + 4 + 1)
+        self.assertEqual(patterns['avg_odd'], round((3 + 3 + 3) / 3, 1))
+        self.assertEqual(patterns['odd_count_distribution'][3], 3)
+        self.assertEqual(patterns['range_distribution'],
+                         {'1-10': 10, '11-20': 3, '21-30': 1, '31-40': 2, '41-46': 2})
+        self.assertEqual(batch.get_summary(), single.get_summary())
+        
+        frequency = single.get_frequency_analysis()
+        self.assertEqual(frequency['frequency']['2']['count'], 2)
+        self.assertEqual(frequency['most_frequent'], {'number': 2, 'count': 2})
+        
+        # Accumulators keep their size no matter how many results arrive
+        sizes = single.frequency.nbytes + single.odd_histogram.nbytes + single.range_counts.nbytes
+        single.add_results_batch(results * 1000)
+        self.assertEqual(single.frequency.nbytes + single.odd_histogram.nbytes + single.range_counts.nbytes, sizes)
+        self.assertEqual(single.total_simulations, 3003)
+        
+    def test_session_registry(self):
+        """Test per-session state with LRU eviction and idle expiry"""
+        registry = SessionRegistry(EntropyDriftAnalyzer, max_entries=2)
+        with registry.session('a') as analyzer:
+            analyzer.update(1.0)
+        with registry.session('b'):
+            pass
+        with registry.session('a') as analyzer:
+            self.assertEqual(analyzer.total_samples, 1)
+        with registry.session('c'):
+            pass
+        # 'b' was least recently used
+        self.assertNotIn('b', registry)
+        self.assertIn('a', registry)
+        self.assertEqual(registry.get_stats()['evictions'], 1)
+        
+        registry.idle_timeout = 0
+        with registry.session('d'):
+            pass
+        self.assertEqual(len(registry), 1)
+        self.assertEqual(registry.get_stats()['expirations'], 2)
+        
     def test_thermodynamics(self):
         """Test statistical thermodynamics"""
         # Generate test energy levels
@@ -4,9 +4,15 @@ Memory monitoring and optimization utilities
 import gc
 import psutil
 import os
+import sys
 from typing import Dict, Any
 import time
 
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
 class MemoryMonitor:
     """Monitor and manage memory usage"""
     
@@ -22,6 +28,15 @@ class MemoryMonitor:
             'vms': memory_info.vms / 1024 / 1024,  # Virtual Memory Size
         }
         
+    def get_peak_memory_usage(self) -> float:
+        """Get peak Resident Set Size of this process in MB"""
+        if resource is not None:
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+            return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+        memory_info = self.process.memory_info()
+        return getattr(memory_info, 'peak_wset', memory_info.rss) / 1024 / 1024
+        
     def get_memory_percent(self) -> float:
         """Get memory usage as percentage of total system memory"""
         return self.process.memory_percent()
@@ -49,6 +64,7 @@ class MemoryMonitor:
         current_memory = self.get_memory_usage()
         return {
             'current_memory_mb': current_memory,
+            'peak_rss_mb': self.get_peak_memory_usage(),
             'memory_percent': self.get_memory_percent(),
             'memory_increase_mb': current_memory['rss'] - self.initial_memory['rss'],
             'gc_stats': {
@@ -0,0 +1,136 @@
+"""
+Per-session state registry with LRU eviction and idle expiry
+"""
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Hashable, Iterator, Optional
+
+import numpy as np
+
+
+def estimate_size(obj: Any, _depth: int = 0) -> int:
+    """Approximate memory footprint in bytes (NumPy buffers counted by nbytes)"""
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    size = sys.getsizeof(obj)
+    if _depth >= 3:
+        return size
+    if isinstance(obj, dict):
+        return size + sum(estimate_size(v, _depth + 1) for v in obj.values())
+    if isinstance(obj, (list, tuple, set)):
+        return size + sum(estimate_size(v, _depth + 1) for v in obj)
+    if hasattr(obj, '__dict__'):
+        return size + estimate_size(vars(obj), _depth + 1)
+    return size
+
+
+class _Entry:
+    __slots__ = ('state', 'lock', 'size', 'last_access')
+
+    def __init__(self, state: Any, size: int):
+        self.state = state
+        self.lock = threading.Lock()
+        self.size = size
+        self.last_access = time.monotonic()
+
+
+class SessionRegistry:
+    """Bounded registry of per-session state objects
+
+    Entries are created lazily by `factory`, evicted least-recently-used
+    once either the entry count or the estimated memory cap is exceeded,
+    and dropped after `idle_timeout` seconds without access. The registry
+    lock only guards the index; each entry has its own lock, so requests
+    for different sessions never contend.
+    """
+
+    def __init__(self, factory: Callable[[], Any], max_entries: int = 1024,
+                 max_memory_mb: float = 64, idle_timeout: float = 1800):
+        self.factory = factory
+        self.max_entries = max_entries
+        self.max_memory_bytes = max_memory_mb * 1024 * 1024
+        self.idle_timeout = idle_timeout
+        self._entries: 'OrderedDict[Hashable, _Entry]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._memory_bytes = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    @contextmanager
+    def session(self, key: Hashable) -> Iterator[Any]:
+        """Yield the state for `key` (creating it if needed) under its own lock"""
+        entry = self._acquire_entry(key)
+        with entry.lock:
+            yield entry.state
+
+    def peek(self, key: Hashable) -> Optional[Any]:
+        """Return the state for `key` without creating it or refreshing its LRU position"""
+        with self._lock:
+            entry = self._entries.get(key)
+        return entry.state if entry is not None else None
+
+    def remove(self, key: Hashable) -> bool:
+        """Drop a session explicitly"""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return False
+            self._memory_bytes -= entry.size
+            return True
+
+    def _acquire_entry(self, key: Hashable) -> _Entry:
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            entry = self._entries.get(key)
+            if entry is None:
+                state = self.factory()
+                entry = _Entry(state, estimate_size(state))
+                self._entries[key] = entry
+                self._memory_bytes += entry.size
+                self._evict(keep=key)
+            else:
+                self._entries.move_to_end(key)
+            entry.last_access = now
+            return entry
+
+    def _expire(self, now: float) -> None:
+        # The index is in access order, so idle entries sit at the front
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if now - entry.last_access < self.idle_timeout:
+                break
+            del self._entries[key]
+            self._memory_bytes -= entry.size
+            self.expirations += 1
+
+    def _evict(self, keep: Hashable) -> None:
+        while len(self._entries) > 1 and (len(self._entries) > self.max_entries or
+                                          self._memory_bytes > self.max_memory_bytes):
+            key, entry = next(iter(self._entries.items()))
+            if key == keep:
+                break
+            del self._entries[key]
+            self._memory_bytes -= entry.size
+            self.evictions += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Registry occupancy and eviction counters"""
+        with self._lock:
+            return {
+                'sessions': len(self._entries),
+                'memory_mb': self._memory_bytes / 1024 / 1024,
+                'max_sessions': self.max_entries,
+                'max_memory_mb': self.max_memory_bytes / 1024 / 1024,
+                'evictions': self.evictions,
+                'expirations': self.expirations
+            }